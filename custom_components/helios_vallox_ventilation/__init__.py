@@ -1,12 +1,22 @@
+import asyncio
 import logging
-from .const import DOMAIN
-from .schema import CONFIG_SCHEMA
+import voluptuous as vol
+from .const import DOMAIN, BUS_ADDRESSES
+from .schema import (
+    FILTER_OPTIONS, CONFIG_SCHEMA, SERVICE_WRITE_VALUE_SCHEMA, SERVICE_WRITE_VALUES_SCHEMA,
+    SERVICE_QUERY_HISTORY_SCHEMA, HISTORY_QUERY_FIELDS, SERVICE_DEVICE_SCHEMA
+)
 from .coordinator import HeliosCoordinator
+from .vent_functions import HeliosBase
 from datetime import timedelta
-from homeassistant.core import HomeAssistant
+from homeassistant.components import websocket_api
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import HomeAssistant, ServiceCall, SupportsResponse
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.exceptions import ServiceValidationError
 from homeassistant.helpers.discovery import async_load_platform
 from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.util import dt as dt_util
 
 # _LOGGER = logging.getLogger(__name__)   # too long, shortening
 _LOGGER = logging.getLogger("helios_vallox.__init__")
@@ -17,15 +27,70 @@ async def async_setup(hass: HomeAssistant, config: dict):
     config = CONFIG_SCHEMA(config)
     ip_address = config[DOMAIN].get("ip_address", "192.168.178.36")
     port = config[DOMAIN].get("port", 502)
+    persistent = config[DOMAIN].get("persistent_connection", True)
+    idle_timeout = config[DOMAIN].get("idle_timeout", 300)
+    passive_listening = config[DOMAIN].get("passive_listening", True)
+    poll_interval = config[DOMAIN].get("poll_interval", 59)
+    verify_writes = config[DOMAIN].get("verify_writes", False)
+    poll_intervals = {
+        entry["name"]: entry["poll_interval"]
+        for platform in ("sensors", "binary_sensors", "switches")
+        for entry in config[DOMAIN].get(platform, [])
+        if "poll_interval" in entry
+    }
+    filters = {
+        entry["name"]: {option: entry[option] for option in FILTER_OPTIONS if option in entry}
+        for entry in config[DOMAIN].get("sensors", [])
+        if any(option in entry for option in ("deadband", "min_publish_interval", "filter"))
+    }
 
-    # Initialize and setup coordinator
-    coordinator = HeliosCoordinator(hass, ip_address, port)
-    hass.data[DOMAIN] = {"coordinator": coordinator, "entities": []}
-    await coordinator.setup_coordinator()
+    # Devices: the default one (top level) plus further units under 'devices', either
+    # behind their own gateway or on the same bus at another mainboard address
+    # (a device without its own 'house' shares the one of the top level unit)
+    house = config[DOMAIN].get("house")
+    devices = [(None, ip_address, port, config[DOMAIN].get("address", BUS_ADDRESSES["MB1"]), house)]
+    devices += [
+        (device["name"], device.get("ip_address", ip_address), device.get("port", port), device["address"],
+         device.get("house", house))
+        for device in config[DOMAIN].get("devices", [])
+    ]
+
+    # Initialize and setup one coordinator per device; devices behind the same gateway
+    # share its connection (polled one after another), separate gateways are polled concurrently
+    gateways = {}
+    coordinators = {}
+    for name, device_ip, device_port, address, device_house in devices:
+        helios = gateways.get((device_ip, device_port))
+        if helios is None:
+            helios = gateways[(device_ip, device_port)] = HeliosBase(
+                hass, device_ip, device_port, persistent=persistent, idle_timeout=idle_timeout,
+                verify_writes=verify_writes, address=address
+            )
+        coordinators[name] = HeliosCoordinator(
+            hass, helios, persistent, passive_listening, poll_interval, poll_intervals, name=name, address=address,
+            house=device_house, history_size=config[DOMAIN].get("history_size"),
+            history_interval=config[DOMAIN].get("history_interval"), filters=filters,
+            fault_watch_interval=config[DOMAIN].get("fault_watch_interval")
+        )
+    hass.data[DOMAIN] = {
+        "coordinator": coordinators[None], "coordinators": coordinators, "gateways": gateways, "entities": []
+    }
+    await asyncio.gather(*(coordinator.setup_coordinator() for coordinator in coordinators.values()))
+    if config[DOMAIN].get("proxy_port"):
+        await coordinators[None].start_proxy(config[DOMAIN].get("proxy_host", "127.0.0.1"), config[DOMAIN]["proxy_port"])
+
+    # Close the (persistent) bus connections when HA stops
+    async def close_connection(_event):
+        if DOMAIN in hass.data:
+            await _async_shutdown(hass.data[DOMAIN])
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, close_connection)
 
     # Load entity platforms
     hass.async_create_task(
-        async_load_platform(hass, "sensor", DOMAIN, {"sensors": config[DOMAIN].get("sensors", [])}, config)
+        async_load_platform(hass, "sensor", DOMAIN, {
+            "sensors": config[DOMAIN].get("sensors", []),
+            "diagnostic_sensors": config[DOMAIN].get("diagnostic_sensors", True),
+        }, config)
     )
     hass.async_create_task(
         async_load_platform(hass, "binary_sensor", DOMAIN, {"binary_sensors": config[DOMAIN].get("binary_sensors", [])}, config)
@@ -34,20 +99,54 @@ async def async_setup(hass: HomeAssistant, config: dict):
         async_load_platform(hass, "switch", DOMAIN, {"switches": config[DOMAIN].get("switches", [])}, config)
     )
 
-    # Set up periodic data refresh
-    async def update_data(_):
-        try:
-            await coordinator._coordinator.async_request_refresh()
-        except Exception as e:
-            _LOGGER.error(f"Error during data refresh: {e}", exc_info=True)
-
-    # Register and manage the write service
+    # Register and manage the write service (optional 'device', default device if omitted)
     async def handle_write_service(call):
+        coordinator = coordinators.get(call.data.get("device"))
+        if coordinator is None:
+            _LOGGER.error(f"Write service: unknown device '{call.data.get('device')}'.")
+            return
         try:
-            await hass.async_add_executor_job(coordinator.write_value, call.data["variable"], call.data["value"])
+            await coordinator.write_value(call.data["variable"], call.data["value"])
         except Exception as e:
             _LOGGER.error(f"Error handling write service: {e}", exc_info=True)
-    hass.services.async_register(DOMAIN, "write_value", handle_write_service, schema=CONFIG_SCHEMA)
+    hass.services.async_register(DOMAIN, "write_value", handle_write_service, schema=SERVICE_WRITE_VALUE_SCHEMA)
+
+    # Register the batch write service: all variables in one bus session, {variable: success} as response
+    async def handle_write_values_service(call: ServiceCall):
+        coordinator = coordinators.get(call.data.get("device"))
+        if coordinator is None:
+            raise ServiceValidationError(f"Unknown device '{call.data.get('device')}'")
+        results = await coordinator.write_values(call.data["values"], call.data.get("verify"))
+        if not all(results.values()):
+            _LOGGER.error(f"Write values service: not written {[v for v, ok in results.items() if not ok]}.")
+        return {"results": results}
+    hass.services.async_register(
+        DOMAIN, "write_values", handle_write_values_service,
+        schema=SERVICE_WRITE_VALUES_SCHEMA, supports_response=SupportsResponse.OPTIONAL
+    )
+
+    # Register the history query: as service with response and as websocket command
+    async def handle_query_history_service(call: ServiceCall):
+        try:
+            return await _async_query_history(coordinators, call.data)
+        except ValueError as e:
+            raise ServiceValidationError(str(e)) from e
+    hass.services.async_register(
+        DOMAIN, "query_history", handle_query_history_service,
+        schema=SERVICE_QUERY_HISTORY_SCHEMA, supports_response=SupportsResponse.ONLY
+    )
+    websocket_api.async_register_command(hass, websocket_query_history)
+
+    # Register the bus statistics service (YAML setup: no config entry for HA diagnostics)
+    async def handle_bus_statistics_service(call: ServiceCall):
+        coordinator = coordinators.get(call.data.get("device"))
+        if coordinator is None:
+            raise ServiceValidationError(f"Unknown device '{call.data.get('device')}'")
+        return {"bus_statistics": coordinator.statistics, "data": coordinator.coordinator.data}
+    hass.services.async_register(
+        DOMAIN, "bus_statistics", handle_bus_statistics_service,
+        schema=SERVICE_DEVICE_SCHEMA, supports_response=SupportsResponse.ONLY
+    )
 
     # Initialization done
     return True
@@ -58,5 +157,51 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
 
 # Unload integration
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
-    hass.data.pop(DOMAIN, None)
+    data = hass.data.pop(DOMAIN, None)
+    if data:
+        await _async_shutdown(data)
     return True
+
+# Shut down all devices, then close the gateway connections they shared
+async def _async_shutdown(data):
+    for coordinator in data["coordinators"].values():
+        await coordinator.async_shutdown()
+    for helios in data["gateways"].values():
+        await helios.disconnect()
+
+# History query of one device (start / end as datetime, timestamps of the result as unix time)
+async def _async_query_history(coordinators, query):
+    coordinator = coordinators.get(query.get("device"))
+    if coordinator is None:
+        raise ValueError(f"Unknown device '{query.get('device')}'")
+    return await coordinator.async_query_history(
+        query["variables"],
+        _timestamp(query.get("start")),
+        _timestamp(query.get("end")),
+        query.get("step"),
+        query.get("aggregate", "mean"),
+    )
+
+# Unix time of a datetime of a query; without offset it is in the time zone of HA
+# (not the one of the system, as datetime.timestamp() would assume)
+def _timestamp(value):
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
+    return value.timestamp()
+
+# Websocket: {"type": "helios_vallox_ventilation/history", "variables": [...], "start": ..., "step": 3600}
+@websocket_api.websocket_command({vol.Required("type"): f"{DOMAIN}/history", **HISTORY_QUERY_FIELDS})
+@websocket_api.async_response
+async def websocket_query_history(hass: HomeAssistant, connection, msg):
+    data = hass.data.get(DOMAIN)
+    if not data:
+        connection.send_error(msg["id"], "not_loaded", "Integration not loaded")
+        return
+    try:
+        result = await _async_query_history(data["coordinators"], msg)
+    except ValueError as e:
+        connection.send_error(msg["id"], "invalid_query", str(e))
+        return
+    connection.send_result(msg["id"], result)
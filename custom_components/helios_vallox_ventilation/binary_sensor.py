@@ -9,25 +9,26 @@ _LOGGER = logging.getLogger("helios_vallox.binary_sensor")
 async def async_setup_platform(hass, config, async_add_entities, discovery_info=None):
     if discovery_info is None:
         return
-    coordinator = hass.data[DOMAIN]["coordinator"]
+    coordinators = hass.data[DOMAIN]["coordinators"].values()
     entities = []
     binary_sensor_config = discovery_info.get("binary_sensors", [])
-    for sensor in binary_sensor_config:
-        name = sensor.get("name")
-        if not name:
-            _LOGGER.warning("Binary sensor configuration missing 'name'. Skipping entry.")
-            continue
-        entities.append(
-            HeliosBinarySensor(
-                name=name,
-                variable=name,
-                coordinator=coordinator,
-                icon=sensor.get("icon"),
-                unique_id=f"ventilation_{name}",
-                description=sensor.get("description"),
-                device_class=sensor.get("device_class"),
+    for coordinator in coordinators:  # one set of entities per device
+        for sensor in binary_sensor_config:
+            name = sensor.get("name")
+            if not name:
+                _LOGGER.warning("Binary sensor configuration missing 'name'. Skipping entry.")
+                continue
+            entities.append(
+                HeliosBinarySensor(
+                    name=name,
+                    variable=name,
+                    coordinator=coordinator,
+                    icon=sensor.get("icon"),
+                    unique_id=coordinator.unique_id(name),
+                    description=sensor.get("description"),
+                    device_class=sensor.get("device_class"),
+                )
             )
-        )
     async_add_entities(entities)
     hass.data.setdefault("ventilation_entities", []).extend(entities)
 
@@ -44,7 +45,7 @@ class HeliosBinarySensor(CoordinatorEntity, BinarySensorEntity):
         device_class=None,
     ):
         super().__init__(coordinator.coordinator)
-        self._attr_name = f"Ventilation {name}"
+        self._attr_name = coordinator.entity_name(name)
         self._variable = variable
         self._coordinator = coordinator
         self._attr_icon = icon
@@ -59,9 +60,13 @@ class HeliosBinarySensor(CoordinatorEntity, BinarySensorEntity):
     # additional state attributes
     @property
     def extra_state_attributes(self):
-        return {k: v for k, v in {"description": self._attr_description}.items() if v}
+        attributes = {
+            "description": self._attr_description,
+            "stale": self._coordinator.stale,  # value from the snapshot
+        }
+        return {k: v for k, v in attributes.items() if v}
 
-    # add entity and subscribe to updates
-    async def async_added_to_hass(self):
-        await super().async_added_to_hass()
-        self.async_on_remove(self.coordinator.async_add_listener(self.async_write_ha_state))
+    # update entity (only if its variable changed)
+    def _handle_coordinator_update(self):
+        if self._coordinator.has_changed(self._variable):
+            super()._handle_coordinator_update()
@@ -7,7 +7,66 @@ DOMAIN = "helios_vallox_ventilation"
 DEFAULT_IP = "192.168.178.36"
 DEFAULT_PORT = 502
 
-# mapping for the four NTC5k temperature sensors
+# persistent connection handling
+DEFAULT_IDLE_TIMEOUT = 300   # close an unused connection after this many seconds
+RECONNECT_BACKOFF_MIN = 1    # first delay after a failed connect (seconds)
+RECONNECT_BACKOFF_MAX = 60   # upper limit for the exponential reconnect delay
+
+# write verification: additional write attempts if the read-back value differs
+WRITE_VERIFY_RETRIES = 2
+
+# write queue: collect writes for this long so repeated writes collapse (seconds)
+WRITE_COALESCE_DELAY = 0.2
+
+# bus slot detection: silence before sending, learned between MIN and MAX (seconds)
+SLOT_SILENCE_DEFAULT = 0.007
+SLOT_SILENCE_MIN = 0.004
+SLOT_SILENCE_MAX = 0.03
+SLOT_TRANSACTION_TIME = 0.05  # request + response, kept clear of expected remote polling
+# retries: jittered exponential backoff between read attempts (seconds)
+RETRY_BACKOFF_BASE = 0.02
+RETRY_BACKOFF_MAX = 1.0
+# response timeout: learned from our own request latency within these limits (seconds)
+RESPONSE_TIMEOUT_MIN = 0.25
+RESPONSE_TIMEOUT_MAX = 1.5
+
+# multiplexing proxy: register values younger than this (s) are answered from its cache
+PROXY_CACHE_AGE = 2.0
+
+# bus scheduler: lower runs first; polls pause between registers for writes and single reads
+BUS_PRIORITY_WRITE = 0
+BUS_PRIORITY_READ = 1
+BUS_PRIORITY_POLL = 2
+
+# boost / fireplace mode: registers (status, remaining minutes) read every BOOST_TRACKING_INTERVAL s
+# while boost is on; after activating boost, BOOST_START_READS reads may still show it off
+BOOST_REGISTERS = (0x71, 0x79)
+BOOST_TRACKING_INTERVAL = 5
+BOOST_START_READS = 3
+
+# fault watcher: fault number and fault / filter / service coils, read every FAULT_WATCH_INTERVAL s
+# besides the regular polling; changes fire EVENT_FAULT
+FAULT_REGISTERS = (0x36, 0xA3)
+FAULT_VARIABLES = ("fault_number", "fault_detected", "clean_filter", "service_requested")
+FAULT_WATCH_INTERVAL = 10
+EVENT_FAULT = "helios_vallox_ventilation_fault"
+
+# snapshot of the last values in HA storage (shown at startup until the first read)
+SNAPSHOT_STORAGE_VERSION = 1
+SNAPSHOT_SAVE_DELAY = 300
+
+# register history in memory (see history.py): samples kept and minimum time between them (s)
+DEFAULT_HISTORY_SIZE = 10080  # one week at one sample per minute
+DEFAULT_HISTORY_INTERVAL = 60
+HISTORY_STORAGE_VERSION = 1
+
+# polling: default interval for registers without their own poll_interval (seconds)
+DEFAULT_POLL_INTERVAL = 59
+MIN_POLL_INTERVAL = 5
+
+# mapping for the four NTC5k temperature sensors (whole degrees, saturating at 100).
+# vent_functions.py interpolates it to a curve with TEMPERATURE_RESOLUTION steps.
+TEMPERATURE_RESOLUTION = 0.1
 NTC5K_TEMPERATURES = array.array(
     "i",
     [
@@ -24,6 +83,23 @@ NTC5K_TEMPERATURES = array.array(
     ]
 )
 
+# diagnostic sensors: name -> (path into HeliosBase.busStatistics(), unit)
+DIAGNOSTIC_SENSORS = {
+    "bus_requests":          (("counters", "requests"), None),
+    "bus_retries":           (("counters", "retries"), None),
+    "bus_timeouts":          (("counters", "timeouts"), None),
+    "bus_read_failures":     (("counters", "read_failures"), None),
+    "bus_crc_failures":      (("counters", "crc_failures"), None),
+    "bus_jitter_bytes":      (("counters", "jitter_bytes"), None),
+    "bus_connects":          (("counters", "connects"), None),
+    "bus_preemptions":       (("counters", "preemptions"), None),
+    "bus_connect_time":      (("connect", "mean_ms"), "ms"),
+    "bus_slot_wait":         (("slot_wait", "mean_ms"), "ms"),
+    "bus_latency":           (("latency", "mean_ms"), "ms"),
+    "bus_latency_p99":       (("latency", "p99_ms"), "ms"),
+    "bus_poll_duration":     (("poll", "mean_ms"), "ms"),
+}
+
 # mapping for valid senders / receivers
 BUS_ADDRESSES = {
     "MB*": 0x10,  # all mainboards
@@ -47,6 +123,14 @@ FANSPEEDS = {
     255: 8
 }
 
+# DIN 1946-6 airflow levels: factor * (-0.001 * area² + 1.15 * area + 20) in m³/h
+# (moisture protection uses the isolation_factor of the house instead, 0.3 .. 0.4)
+DIN_AIRFLOW_FACTORS = {
+    "din_airflow_reduced_exchange": 0.7,
+    "din_airflow_normal_exchange":  1.0,
+    "din_airflow_boost_exchange":   1.15,
+}
+
 # mapping error messages / faults
 COMPONENT_FAULTS = {
     0:  '-',
@@ -104,15 +188,16 @@ REGISTERS_AND_COILS = {
     # Boost mode: 0=fireplace  (ignition - no exhaust air in the first 15 minutes of boost); 1=normal boost mode
     "boost_mode":              {"varid": 0xAA, 'type': 'bit',         'bitposition':  5, 'read': True, 'write': True },
     # Switch boost on for 45 minutes (set to 1; will be reset by mainboard automatically)
-    "activate_boost":          {"varid": 0x71, 'type': 'bit',         'bitposition':  5, 'read': True, 'write': True },
+    # (the mainboard resets this bit by itself, so a read-back cannot confirm the write)
+    "activate_boost":          {"varid": 0x71, 'type': 'bit',         'bitposition':  5, 'read': True, 'write': True, 'verify': False},
     # Current boost status (off/on)
     "boost_status":            {"varid": 0x71, 'type': 'bit',         'bitposition':  6, 'read': True, 'write': False},
     # Remaining minutes of boost if on
     "boost_remaining":         {"varid": 0x79, 'type': 'dec',         'bitposition': -1, 'read': True, 'write': False},
     # Fresh air vetilator off; set to 1 to switch off; requires to be set twice
-    "input_fan_off":           {"varid": 0x08, 'type': 'bit',         'bitposition':  3, 'read': True, 'write': True },
+    "input_fan_off":           {"varid": 0x08, 'type': 'bit',         'bitposition':  3, 'read': True, 'write': True, 'write_twice': True},
     # Exhaust air vetilator off; set to 1 to switch off; requires to be set twice
-    "output_fan_off":          {"varid": 0x08, 'type': 'bit',         'bitposition':  5, 'read': True, 'write': True },
+    "output_fan_off":          {"varid": 0x08, 'type': 'bit',         'bitposition':  5, 'read': True, 'write': True, 'write_twice': True},
     # rpm of fresh air ventilator (65...100% - pneumatic calibration; default=100)
     "input_fan_percent":       {"varid": 0xB0, 'type': 'dec',         'bitposition': -1, 'read': True, 'write': True },
     # rpm of exhaust air ventilator (65...100% - pneumatic calibration; default=100)
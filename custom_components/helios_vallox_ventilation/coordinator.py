@@ -1,9 +1,22 @@
 import asyncio
 import logging
+import statistics
+import time
+from collections import deque
 from datetime import timedelta
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
-from .vent_functions import HeliosBase
+from .const import (
+    DOMAIN, DEFAULT_POLL_INTERVAL, REGISTERS_AND_COILS, WRITE_COALESCE_DELAY,
+    SNAPSHOT_STORAGE_VERSION, SNAPSHOT_SAVE_DELAY, DEFAULT_HISTORY_SIZE, DEFAULT_HISTORY_INTERVAL,
+    HISTORY_STORAGE_VERSION, BOOST_REGISTERS, BOOST_TRACKING_INTERVAL, BOOST_START_READS,
+    FAULT_REGISTERS, FAULT_VARIABLES, FAULT_WATCH_INTERVAL, EVENT_FAULT
+)
+from .vent_functions import HeliosBase, READ_PLAN, CALCULATION_INPUTS
+from .proxy import HeliosProxy
+from .history import RegisterHistory
 
 # _LOGGER = logging.getLogger(__name__)
 _LOGGER = logging.getLogger("helios_vallox.coordinator")
@@ -11,18 +24,61 @@ _LOGGER = logging.getLogger("helios_vallox.coordinator")
 class HeliosCoordinator:
 
     # Initialize data update coordinator
-    def __init__(self, hass: HomeAssistant, ip: str, port: int):
+    # helios: connection to the gateway, shared by all devices behind it (the device is
+    # the mainboard at address on its bus)
+    def __init__(self, hass: HomeAssistant, helios: HeliosBase, persistent: bool = True,
+                 passive_listening: bool = True, poll_interval: int = DEFAULT_POLL_INTERVAL,
+                 poll_intervals: dict | None = None, name: str | None = None,
+                 address: int | None = None, house: dict | None = None,
+                 history_size: int = DEFAULT_HISTORY_SIZE, history_interval: int = DEFAULT_HISTORY_INTERVAL,
+                 filters: dict | None = None, fault_watch_interval: int = FAULT_WATCH_INTERVAL):
         self._hass = hass
-        self._ip = ip
-        self._port = port
+        self._name = name  # None for the default device
         self._lock = asyncio.Lock()
-        self._helios = HeliosBase(hass, ip, port)
+        self._helios = helios
+        self._address = helios.addMainboard(helios._address if address is None else address, name, house).address
+        self._persistent = persistent
+        self._passive_listening = passive_listening and persistent  # listener needs the connection
+        self._unsub_idle_check = None
+        self._unsub_boost_tracking = None
+        self._unsub_fault_watch = None
+        self._fault_watch_interval = fault_watch_interval
+        self._boost_start_reads = 0  # reads left for a just activated boost to show up
+        self._proxy = None
+        # tiered polling: a register is read as often as its most urgent variable requires
+        poll_intervals = poll_intervals or {}
+        self._register_intervals = {
+            varid: min(poll_intervals.get(varname, poll_interval) for varname in varnames)
+            for varid, varnames in READ_PLAN.items()
+        }
+        self._tick = min(self._register_intervals.values())
+        self._last_polled = {}
+        # write queue: latest value per variable, flushed in one bus session
+        self._write_queue = {}
+        self._write_waiters = []
+        self._flush_task = None
+        self._statistics = {}
+        self._changed = None  # variables changed by the last update (None: all)
+        # per sensor filters against flicker: smoothing window, deadband, minimum publish interval
+        self._filters = filters or {}
+        self._filter_windows = {
+            variable: deque(maxlen=options["filter_window"])
+            for variable, options in self._filters.items() if options.get("filter")
+        }
+        self._published = {}  # variable -> time of the last published change
+        # last good values on disk, shown at startup (stale) until the first read
+        self._store = Store(hass, SNAPSHOT_STORAGE_VERSION, self._storage_key("snapshot"))
+        self._stale = False
+        # raw register history for trend queries (service / websocket, see history.py)
+        self._history = RegisterHistory(history_size) if history_size else None
+        self._history_interval = history_interval
+        self._history_store = Store(hass, HISTORY_STORAGE_VERSION, self._storage_key("history"))
         self._coordinator = DataUpdateCoordinator(
             hass,
             _LOGGER,
-            name="Helios Vallox Data Coordinator",
+            name=f"Helios Vallox Data Coordinator {name}" if name else "Helios Vallox Data Coordinator",
             update_method=self._async_update_data,
-            update_interval=timedelta(seconds=59), # see also __init__.py
+            update_interval=timedelta(seconds=self._tick),
         )
 
     # Declare coordinator property
@@ -30,39 +86,360 @@ class HeliosCoordinator:
     def coordinator(self):
         return self._coordinator
 
+    # Device name (None for the default device)
+    @property
+    def name(self):
+        return self._name
+
+    # Entity naming: default device keeps "ventilation_<variable>", others are namespaced
+    def entity_name(self, variable):
+        return f"Ventilation {self._name} {variable}" if self._name else f"Ventilation {variable}"
+
+    def unique_id(self, variable):
+        return f"ventilation_{self._name}_{variable}" if self._name else f"ventilation_{variable}"
+
+    # Bus statistics as of the last poll (diagnostic sensors / bus_statistics service)
+    @property
+    def statistics(self):
+        return self._statistics
+
+    # Values are taken from the snapshot and not (yet) read from the bus
+    @property
+    def stale(self):
+        return self._stale
+
+    # Did the last update change this variable? (entities skip their state write if not)
+    def has_changed(self, variable):
+        return self._changed is None or variable in self._changed
+
+    # HA storage key of this device (named devices apart from the default one, even if named 'default')
+    def _storage_key(self, kind):
+        return f"{DOMAIN}.device.{self._name}.{kind}" if self._name else f"{DOMAIN}.default.{kind}"
+
+    # Register history: time series of variables between start and end (unix time),
+    # downsampled to buckets of step seconds if given; derived variables are calculated per sample.
+    # Decoding a week of samples takes a while: a copy taken here (polls keep adding samples
+    # on the event loop) is queried in the executor
+    async def async_query_history(self, variables, start=None, end=None, step=None, aggregate="mean"):
+        if self._history is None:
+            raise ValueError("history is disabled (history_size: 0)")
+        history = self._history.copy()
+        return await self._hass.async_add_executor_job(
+            history.query, variables, start, end, step, aggregate, self._calculate
+        )
+
     # Setup the coordinator
     async def setup_coordinator(self):
-        if await self._hass.async_add_executor_job(self._helios._connect):
-            await self._coordinator.async_refresh()
+        if self._persistent:
+            self._unsub_idle_check = async_track_time_interval(
+                self._hass, self._async_close_idle_connection, timedelta(seconds=30)
+            )
+        if self._fault_watch_interval:
+            self._unsub_fault_watch = async_track_time_interval(
+                self._hass, self._async_watch_faults, timedelta(seconds=self._fault_watch_interval)
+            )
+        restored = await self._async_load_snapshot()
+        await self._async_load_history()
+        if not await self._helios.connect():
+            _LOGGER.error(f"Failed to connect to ventilation '{self._name or 'default'}' during setup.")
+        elif restored:
+            self._hass.async_create_task(self._coordinator.async_refresh())  # entities show the snapshot meanwhile
         else:
-            _LOGGER.error("Failed to connect to ventilation during setup.")
+            await self._coordinator.async_refresh()
+        if self._passive_listening:
+            self._helios.startListening(self._async_merge_values, self._address)
+
+    # Share the bus connection with other clients (see proxy.py)
+    async def start_proxy(self, host, port):
+        self._proxy = HeliosProxy(self._helios, address=self._address)
+        try:
+            await self._proxy.start(host, port)
+        except OSError as e:
+            _LOGGER.error(f"Failed to start proxy on {host}:{port}: {e}")
+            self._proxy = None
+
+    # Load the last snapshot: coordinator data and the raw registers of HeliosBase
+    async def _async_load_snapshot(self):
+        try:
+            snapshot = await self._store.async_load()
+        except Exception as e:
+            _LOGGER.warning(f"Cannot load snapshot: {e}")
+            return False
+        if not snapshot or not snapshot.get("data"):
+            return False
+        self._helios.restoreRegisters(
+            {int(varid): raw for varid, raw in snapshot.get("registers", {}).items()}, self._address
+        )
+        self._coordinator.data = snapshot["data"]
+        self._stale = True
+        _LOGGER.debug(f"Restored {len(snapshot['data'])} values from the snapshot of {snapshot.get('saved')}.")
+        return True
+
+    # Load the register history of the last run
+    async def _async_load_history(self):
+        if self._history is None:
+            return
+        try:
+            exported = await self._history_store.async_load()
+            if exported:
+                self._history.restore(exported)
+        except Exception as e:
+            _LOGGER.warning(f"Cannot load history: {e}")
+
+    # Add the current registers to the history (at most every history_interval seconds)
+    def _record_history(self):
+        if self._history is None:
+            return
+        now = time.time()
+        if len(self._history) and now - self._history.last_timestamp < self._history_interval - self._tick / 2:
+            return
+        self._history.add(now, self._helios.cachedRegisters(self._address))
+        self._history_store.async_delay_save(self._history.export, SNAPSHOT_SAVE_DELAY)
+
+    # Snapshot content (saved delayed after polls and at shutdown)
+    @callback
+    def _snapshot(self):
+        return {
+            "saved": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "data": self._coordinator.data,
+            "registers": self._helios.cachedRegisters(self._address),
+        }
 
-    # Read all known registers (see vent_conf.yaml and const.py)
+    # Stop polling and listening (unload / HA shutdown); the shared connection is closed
+    # by the integration once all devices behind the gateway are shut down
+    async def async_shutdown(self):
+        if self._coordinator.data and not self._stale:
+            await self._store.async_save(self._snapshot())
+        if self._history is not None and len(self._history):
+            await self._history_store.async_save(self._history.export())
+        if self._proxy is not None:
+            await self._proxy.stop()
+            self._proxy = None
+        if self._unsub_idle_check:
+            self._unsub_idle_check()
+            self._unsub_idle_check = None
+        self._track_boost(False)
+        if self._unsub_fault_watch:
+            self._unsub_fault_watch()
+            self._unsub_fault_watch = None
+        await self._helios.stopListening(self._address)
+
+    # Close a persistent connection that has not been used for a while
+    async def _async_close_idle_connection(self, _now=None):
+        await self._helios.closeIdleConnection()
+
+    # Read all registers that are due (see poll_interval in vent_conf.yaml)
     async def _async_update_data(self):
         try:
-            data = await self._hass.async_add_executor_job(self._helios.readAllValues)
+            now = time.monotonic()
+            due = [
+                varid for varid, interval in self._register_intervals.items()
+                if now - self._last_polled.get(varid, float("-inf")) >= interval - self._tick / 2
+            ]
+            values = await self._helios.readRegisters(due, self._address)
+            for varid in due:
+                if any(values.get(varname) is not None for varname in READ_PLAN[varid]):
+                    self._last_polled[varid] = now  # failed registers stay due
+            self._statistics = self._helios.busStatistics()
+            data = self._apply_values(self._coordinator.data, values, polled=True)
+            if self._stale and any(value is not None for value in values.values()):
+                self._stale = False
+                self._changed = None  # all entities drop their stale flag
+            if not self._stale:
+                self._store.async_delay_save(self._snapshot, SNAPSHOT_SAVE_DELAY)
+                self._record_history()
+            self._check_boost(data)
             return data
         except Exception as e:
             _LOGGER.error(f"Error fetching data: {e}", exc_info=True)
+            self._changed = set()
+            return self._coordinator.data or {}
+
+    # Derived values (fault text, efficiency, ...) with the house data of this device
+    def _calculate(self, values):
+        return self._helios._addCalculationsToReadings(values, self._address)
+
+    # New data from current data and new values: derived values are only recalculated if
+    # one of their inputs changed, changed variables are remembered for the entities
+    # (polled: values of the regular poll, the only ones fed into the smoothing windows)
+    def _apply_values(self, data, values, polled=False):
+        values = self._filter_values(data or {}, values, polled=polled)
+        if data is None:
+            self._changed = None
+            return self._calculate(dict(values))
+        changed = {k for k, v in values.items() if data.get(k) != v}
+        new_data = {**data, **values}
+        if changed & CALCULATION_INPUTS:
+            # derived values of failed inputs are unknown, not the last calculated ones
+            new_data.update((k, None) for k in data if k not in REGISTERS_AND_COILS)
+            new_data = self._filter_values(data, self._calculate(new_data), derived=True, polled=polled)
+            changed |= {k for k, v in new_data.items() if data.get(k) != v}
+        self._changed = changed
+        self._fire_fault_events(data, new_data, changed)
+        return new_data
+
+    # Apply the filters of vent_conf.yaml: smooth the value (moving average / median over the
+    # last filter_window polls), then keep the published value if the change is within the
+    # deadband or the last published change is younger than min_publish_interval
+    # (derived: only calculated variables, the register values are filtered already).
+    # The window spans filter_window poll intervals however busy the bus is: values decoded
+    # from bus traffic or side reads (not polled) of smoothed variables wait for the next poll
+    def _filter_values(self, data, values, derived=False, polled=False):
+        if not self._filters:
+            return values
+        values = dict(values)
+        now = time.monotonic()
+        for variable, options in self._filters.items():
+            if derived and variable in REGISTERS_AND_COILS:
+                continue
+            value = values.get(variable)
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                continue
+            window = self._filter_windows.get(variable)
+            if window is not None:
+                if not polled and variable in data:
+                    values[variable] = data[variable]
+                    continue
+                window.append(value)
+                if options["filter"] == "median":
+                    value = statistics.median_low(window)
+                else:
+                    value = round(sum(window) / len(window), 2)
+            published = data.get(variable)
+            if isinstance(published, (int, float)) and value != published:
+                if abs(value - published) < options.get("deadband", 0) or \
+                        now - self._published.get(variable, float("-inf")) < options.get("min_publish_interval", 0):
+                    value = published
+                else:
+                    self._published[variable] = now
+            values[variable] = value
+        return values
+
+    # Merge values (decoded from bus traffic or confirmed writes) into the current data
+    # without rescheduling the regular poll
+    @callback
+    def _async_merge_values(self, values):
+        data = self._coordinator.data
+        if data is None or all(data.get(k) == v for k, v in values.items()):
+            return
+        self._coordinator.data = self._apply_values(data, values)
+        self._coordinator.async_update_listeners()
+        self._check_boost(self._coordinator.data)
+
+    # Boost / fireplace mode: while it is on, its registers are read every few seconds
+    # (countdown, end of boost); regular polling takes over again when boost_status clears
+    @callback
+    def _check_boost(self, data):
+        if data.get("boost_status"):
+            self._boost_start_reads = 0
+            self._track_boost(True)
+        elif not self._boost_start_reads:
+            self._track_boost(False)
+
+    @callback
+    def _track_boost(self, active):
+        if active and self._unsub_boost_tracking is None:
+            _LOGGER.debug("Boost on: tracking boost registers.")
+            self._unsub_boost_tracking = async_track_time_interval(
+                self._hass, self._async_read_boost, timedelta(seconds=BOOST_TRACKING_INTERVAL)
+            )
+        elif not active and self._unsub_boost_tracking is not None:
+            _LOGGER.debug("Boost off: back to regular polling.")
+            self._unsub_boost_tracking()
+            self._unsub_boost_tracking = None
+
+    async def _async_read_boost(self, _now=None):
+        values = await self._async_read_registers(BOOST_REGISTERS)
+        if values.get("boost_status") is None:
+            return  # failed or skipped read: keep tracking
+        if values["boost_status"] is False and self._boost_start_reads:
+            self._boost_start_reads -= 1
+        if self._coordinator.data is not None:
+            self._check_boost(self._coordinator.data)
+
+    # Fault watcher: fault number and coils between the regular polls (passively decoded
+    # values arrive through _async_merge_values anyway)
+    async def _async_watch_faults(self, _now=None):
+        await self._async_read_registers(FAULT_REGISTERS)
+
+    # Fire an event for every changed fault variable (entities are updated by the listeners)
+    @callback
+    def _fire_fault_events(self, data, new_data, changed):
+        for variable in FAULT_VARIABLES:
+            if variable in changed and new_data.get(variable) is not None and data.get(variable) is not None:
+                _LOGGER.info(f"Ventilation {self._name or 'default'}: {variable} {data[variable]} -> {new_data[variable]}")
+                self._hass.bus.async_fire(EVENT_FAULT, {
+                    "device": self._name,
+                    "variable": variable,
+                    "value": new_data[variable],
+                    "previous": data[variable],
+                    "fault_text": new_data.get("fault_text"),
+                })
+
+    # Read a few registers outside the regular poll and merge the values read successfully
+    # (boost, fault watcher); skipped while the previous such read still waits for the bus
+    async def _async_read_registers(self, varids):
+        if self._lock.locked():
             return {}
+        async with self._lock:
+            values = await self._helios.readRegisters(varids, self._address)
+        values = {k: v for k, v in values.items() if v is not None}  # failed reads keep the last value
+        now = time.monotonic()
+        for varid in varids:
+            if any(varname in values for varname in READ_PLAN[varid]):
+                self._last_polled[varid] = now  # no need to read them again in the sweep
+        if values:
+            self._async_merge_values(values)
+        return values
+
+    # Write a single variable (queued; repeated writes to a variable collapse into the latest)
+    async def write_value(self, variable, value):
+        self._write_queue[variable] = value
+        future = self._hass.loop.create_future()
+        self._write_waiters.append((variable, future))
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = self._hass.async_create_task(self._async_flush_writes())
+        return await future
 
-    # Write a single register
-    def write_value(self, variable, value):
+    # Write several variables in one bus session (write_values service): all values are
+    # validated first, nothing is written if one is invalid. Returns {variable: success}
+    async def write_values(self, values, verify=None):
         try:
-            result = self._helios.writeValue(variable, value)
-            if result:
-                new_data = self._coordinator.data.copy() if self._coordinator.data else {}
-                new_data[variable] = value
-                self._hass.loop.call_soon_threadsafe(self._coordinator.async_set_updated_data, new_data)
-            return result
+            results = await self._helios.writeValues(values, verify, atomic=True, address=self._address)
         except Exception as e:
-            _LOGGER.error(f"Error writing {value} to {variable}: {e}", exc_info=True)
-            return False
+            _LOGGER.error(f"Error writing {values}: {e}", exc_info=True)
+            return {variable: False for variable in values}
+        for varid in {REGISTERS_AND_COILS[v]["varid"] for v, ok in results.items() if ok}:
+            self._async_merge_values(self._helios.registerValues(varid, self._address))
+        if values.get("activate_boost") and results.get("activate_boost"):
+            self._boost_start_reads = BOOST_START_READS
+            self._track_boost(True)
+        return results
+
+    # Flush the write queue; bits of the same register are merged into one telegram
+    async def _async_flush_writes(self):
+        await asyncio.sleep(WRITE_COALESCE_DELAY)
+        while self._write_queue:
+            writes, waiters = self._write_queue, self._write_waiters
+            self._write_queue, self._write_waiters = {}, []
+            try:
+                results = await self._helios.writeValues(writes, address=self._address)
+                if writes.get("activate_boost") and results.get("activate_boost"):
+                    self._boost_start_reads = BOOST_START_READS
+                    self._track_boost(True)
+                for varid in {REGISTERS_AND_COILS[v]["varid"] for v, ok in results.items() if ok}:
+                    self._async_merge_values(self._helios.registerValues(varid, self._address))
+            except Exception as e:
+                _LOGGER.error(f"Error writing {writes}: {e}", exc_info=True)
+                results = {}
+            for variable, future in waiters:
+                if not future.done():
+                    future.set_result(results.get(variable, False))
 
     # Switch: Turn on
     async def turn_on(self, variable):
-        self._hass.async_add_executor_job(self.write_value, variable, 1)
+        await self.write_value(variable, 1)
 
     # Switch: Turn off
     async def turn_off(self, variable):
-        self._hass.async_add_executor_job(self.write_value, variable, 0)
+        await self.write_value(variable, 0)
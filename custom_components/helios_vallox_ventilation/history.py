@@ -0,0 +1,189 @@
+# Fixed-size history of raw register snapshots
+# Every sample is a timestamp plus one byte per register (and a bit per register telling if
+# it was known), kept in preallocated arrays that are overwritten when full. Values are only
+# decoded when queried, optionally downsampled into buckets (mean / min / max / last).
+
+import array
+import base64
+import bisect
+import copy
+
+try:
+    from .const import REGISTERS_AND_COILS # HA
+    from .vent_functions import READ_PLAN, DECODE_TABLES, CALCULATION_INPUTS
+except ImportError:
+    from const import REGISTERS_AND_COILS # Shell / CLI for testing
+    from vent_functions import READ_PLAN, DECODE_TABLES, CALCULATION_INPUTS
+
+AGGREGATES = ("mean", "min", "max", "last")
+
+
+class RegisterHistory:
+
+    def __init__(self, size, registers=None):
+        self.registers = tuple(sorted(READ_PLAN if registers is None else registers))
+        self._index = {varid: index for index, varid in enumerate(self.registers)}
+        self._mask_size = (len(self.registers) + 7) // 8
+        self.size = size
+        self._times = array.array("d", bytes(8 * size))
+        self._raw = bytearray(size * len(self.registers))
+        self._known = bytearray(size * self._mask_size)
+        self._next = 0    # slot of the next sample
+        self._count = 0   # samples stored (<= size)
+
+    def __len__(self):
+        return self._count
+
+    # bytes per sample (timestamp, raw values, known bits)
+    @property
+    def sample_size(self):
+        return 8 + len(self.registers) + self._mask_size
+
+    # store the raw values {varid: rawvalue} of all registers at timestamp (unix time)
+    def add(self, timestamp, registers):
+        slot = self._next
+        width = len(self.registers)
+        raw = bytearray(width)
+        known = bytearray(self._mask_size)
+        for varid, rawvalue in registers.items():
+            index = self._index.get(varid)
+            if index is not None:
+                raw[index] = rawvalue
+                known[index >> 3] |= 1 << (index & 7)
+        self._times[slot] = timestamp
+        self._raw[slot * width:(slot + 1) * width] = raw
+        self._known[slot * self._mask_size:(slot + 1) * self._mask_size] = known
+        self._next = (slot + 1) % self.size
+        self._count = min(self._count + 1, self.size)
+
+    # timestamp of the newest sample
+    @property
+    def last_timestamp(self):
+        return self._times[(self._next - 1) % self.size] if self._count else None
+
+    # content for HA storage (JSON): the arrays base64 encoded, oldest sample first
+    def export(self):
+        slots = self._slots()
+        width = len(self.registers)
+        times = array.array("d", (self._times[slot] for slot in slots))
+        raw = b"".join(self._raw[slot * width:(slot + 1) * width] for slot in slots)
+        known = b"".join(self._known[slot * self._mask_size:(slot + 1) * self._mask_size] for slot in slots)
+        return {
+            "registers": list(self.registers),
+            "times": base64.b64encode(times.tobytes()).decode(),
+            "raw": base64.b64encode(raw).decode(),
+            "known": base64.b64encode(known).decode(),
+        }
+
+    # load an export (samples of registers no longer read are dropped, new ones are unknown)
+    def restore(self, exported):
+        times = array.array("d")
+        times.frombytes(base64.b64decode(exported["times"]))
+        raw = base64.b64decode(exported["raw"])
+        known = base64.b64decode(exported["known"])
+        registers = exported["registers"]
+        width, mask_size = len(registers), (len(registers) + 7) // 8
+        if tuple(registers) == self.registers and not self._count:
+            # same layout: copy the newest samples in one go
+            count = min(len(times), self.size)
+            first = len(times) - count
+            self._times[:count] = times[first:]
+            self._raw[:count * width] = raw[first * width:len(times) * width]
+            self._known[:count * mask_size] = known[first * mask_size:len(times) * mask_size]
+            self._count, self._next = count, count % self.size
+            return
+        for position, timestamp in enumerate(times[-self.size:], start=max(0, len(times) - self.size)):
+            sample_raw = raw[position * width:(position + 1) * width]
+            sample_known = known[position * mask_size:(position + 1) * mask_size]
+            self.add(timestamp, {
+                varid: sample_raw[index] for index, varid in enumerate(registers)
+                if sample_known[index >> 3] >> (index & 7) & 1
+            })
+
+    # independent copy of the samples, e.g. to query them in another thread while new
+    # samples are added (the arrays are copied in one go, the layout is shared)
+    def copy(self):
+        history = copy.copy(self)
+        history._times = array.array("d", self._times)
+        history._raw = bytearray(self._raw)
+        history._known = bytearray(self._known)
+        return history
+
+    # slots from the oldest to the newest sample
+    def _slots(self):
+        first = (self._next - self._count) % self.size
+        return [(first + offset) % self.size for offset in range(self._count)]
+
+    # decoded samples {varname: value} between start and end (unix time, both optional);
+    # only the registers of the given variables are decoded (all if None), calculate is only
+    # called (with the inputs of the calculations) if a variable is not stored in a register
+    def samples(self, start=None, end=None, variables=None, calculate=None):
+        slots = self._slots()
+        times = [self._times[slot] for slot in slots]
+        first = 0 if start is None else bisect.bisect_left(times, start)
+        last = len(times) if end is None else bisect.bisect_right(times, end)
+        if variables is None:
+            wanted = {varname for varnames in READ_PLAN.values() for varname in varnames}
+        else:
+            wanted = {varname for varname in variables if varname in REGISTERS_AND_COILS}
+            if calculate is not None and len(wanted) < len(variables):
+                wanted |= CALCULATION_INPUTS
+            else:
+                calculate = None
+        decoders = []  # (index, mask byte, mask bit, [(varname, table)])
+        for index, varid in enumerate(self.registers):
+            tables = [(varname, DECODE_TABLES[varname]) for varname in READ_PLAN[varid]
+                      if varname in wanted and DECODE_TABLES[varname] is not None]
+            if tables:
+                decoders.append((index, index >> 3, 1 << (index & 7), tables))
+        width, mask_size = len(self.registers), self._mask_size
+        for position in range(first, last):
+            slot = slots[position]
+            offset, mask_offset = slot * width, slot * mask_size
+            values = {}
+            for index, mask_byte, mask_bit, tables in decoders:
+                if self._known[mask_offset + mask_byte] & mask_bit:
+                    rawvalue = self._raw[offset + index]
+                    for varname, table in tables:
+                        values[varname] = table[rawvalue]
+            if calculate is not None:
+                values = calculate(values)
+            yield times[position], values
+
+    # time series of the given variables, downsampled to buckets of step seconds if given;
+    # calculate (e.g. HeliosBase._addCalculationsToReadings) adds derived variables
+    def query(self, variables, start=None, end=None, step=None, aggregate="mean", calculate=None):
+        if aggregate not in AGGREGATES:
+            raise ValueError(f"Unknown aggregate '{aggregate}'")
+        result = {"timestamps": [], "values": {varname: [] for varname in variables}}
+        buckets = {}
+        for timestamp, values in self.samples(start, end, variables, calculate):
+            if not step:
+                result["timestamps"].append(timestamp)
+                for varname in variables:
+                    result["values"][varname].append(values.get(varname))
+                continue
+            bucket = buckets.setdefault(timestamp - timestamp % step, {varname: [] for varname in variables})
+            for varname in variables:
+                value = values.get(varname)
+                if value is not None:
+                    bucket[varname].append(value)
+        for bucket_start, bucket in sorted(buckets.items()):
+            result["timestamps"].append(bucket_start)
+            for varname, values in bucket.items():
+                result["values"][varname].append(_aggregate(values, aggregate))
+        return result
+
+
+def _aggregate(values, aggregate):
+    if not values:
+        return None
+    if aggregate == "last":
+        return values[-1]
+    values = [float(value) for value in values]  # bits: share of samples that were on (mean)
+    if aggregate == "min":
+        return min(values)
+    if aggregate == "max":
+        return max(values)
+    return round(sum(values) / len(values), 2)
+
@@ -0,0 +1,161 @@
+# Multiplexing proxy for several clients on one RS485 adaptor
+# One process holds the gateway connection; clients (further HA instances, SmartHomeNG,
+# the CLI of vent_functions.py) connect to the proxy as if it was the adaptor and speak
+# the same telegrams. Reads of a register already in flight are not repeated, recent
+# values are answered from a cache, and all bus traffic is shared with every client.
+# How to use:
+#    python3 proxy.py --ip 192.168.178.36 --port 502 --listen-port 5020
+# or set proxy_port in vent_conf.yaml to serve the connection of the integration.
+
+import argparse
+import asyncio
+import logging
+import time
+
+try:
+    from .const import BUS_ADDRESSES, DEFAULT_IP, DEFAULT_PORT, PROXY_CACHE_AGE # HA
+    from .vent_functions import HeliosBase, TelegramFramer, WRITABLE_REGISTERS
+except ImportError:
+    from const import BUS_ADDRESSES, DEFAULT_IP, DEFAULT_PORT, PROXY_CACHE_AGE # Shell / CLI
+    from vent_functions import HeliosBase, TelegramFramer, WRITABLE_REGISTERS
+
+
+def _telegram(sender, receiver, register, value):
+    telegram = bytearray((0x01, sender, receiver, register, value, 0))
+    telegram[5] = sum(telegram[:5]) & 0xFF
+    return bytes(telegram)
+
+
+class HeliosProxy:
+
+    def __init__(self, helios, cache_age=PROXY_CACHE_AGE, address=None):
+        # self.logger = logging.getLogger(__name__)
+        self.logger = logging.getLogger("helios_vallox.proxy")
+        self._helios = helios
+        self._address = helios._address if address is None else address  # mainboard served
+        self._cache_age = cache_age
+        self._cache = {}      # register -> (rawvalue, time)
+        self._waiters = {}    # register -> [(writer, sender)] waiting for the mainboard's answer
+        self._inflight = {}   # register -> read task
+        self._clients = set()
+        self._server = None
+        self.stats = dict.fromkeys(("requests", "bus_reads", "cache_hits", "deduplicated", "forwarded", "rejected"), 0)
+
+    async def start(self, host="127.0.0.1", port=0):
+        self._helios.watchTelegrams(self._onBusTelegram)
+        self._server = await asyncio.start_server(self._handleClient, host, port)
+        port = self._server.sockets[0].getsockname()[1]
+        self.logger.info(f"Proxy listening on {host}:{port}.")
+        return port
+
+    async def stop(self):
+        self._helios.watchTelegrams(None)
+        for task in list(self._inflight.values()):
+            task.cancel()
+        for writer in list(self._clients):
+            writer.close()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    # one connected client: frame its telegrams like an adaptor would
+    async def _handleClient(self, reader, writer):
+        self._clients.add(writer)
+        framer = TelegramFramer()
+        try:
+            while data := await reader.read(256):
+                for telegram in framer.feed(data):
+                    await self._handleRequest(writer, telegram)
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._clients.discard(writer)
+            writer.close()
+
+    async def _handleRequest(self, writer, telegram):
+        sender, receiver, register, value = telegram[1], telegram[2], telegram[3], telegram[4]
+        if register == 0 and receiver == self._address:
+            # read request: answer from the cache, join a read in flight or start one
+            self.stats["requests"] += 1
+            cached = self._cache.get(value)
+            if cached is not None and time.monotonic() - cached[1] <= self._cache_age:
+                self.stats["cache_hits"] += 1
+                writer.write(_telegram(self._address, sender, value, cached[0]))
+                return
+            self._waiters.setdefault(value, []).append((writer, sender))
+            if value in self._inflight:
+                self.stats["deduplicated"] += 1
+            else:
+                self._inflight[value] = asyncio.get_running_loop().create_task(self._read(value))
+            return
+        # writes and telegrams to other devices go to the bus as they are, except writes of 06h
+        # (may cause irreparable damage) and of registers without writable variables to the mainboard
+        to_mainboard = receiver in (self._address, BUS_ADDRESSES["MB*"])
+        if register != 0 and (register == 0x06 or to_mainboard and register not in WRITABLE_REGISTERS):
+            self.stats["rejected"] += 1
+            self.logger.warning(f"Rejected write of 0x{value:02X} to register 0x{register:02X} from 0x{sender:02X}.")
+            return
+        if register != 0 and to_mainboard:
+            self._cache.pop(register, None)
+        self.stats["forwarded"] += 1
+        if await self._helios.forwardTelegram(telegram):
+            self._broadcast(telegram, exclude={writer})  # as the other clients would see it on the bus
+
+    async def _read(self, register):
+        try:
+            self.stats["bus_reads"] += 1
+            if await self._helios.readRaw(register, self._address) is None:
+                self._waiters.pop(register, None)  # clients time out and retry, as on the bus
+        finally:
+            self._inflight.pop(register, None)
+
+    # every telegram from the bus (and our own writes): answer waiting clients, share everything else
+    def _onBusTelegram(self, telegram):
+        sender, receiver, register, rawvalue = telegram[1], telegram[2], telegram[3], telegram[4]
+        waiters = []
+        if register != 0 and sender != self._address and receiver in (self._address, BUS_ADDRESSES["MB*"]):
+            self._cache.pop(register, None)  # written: read it again from the mainboard
+        elif sender == self._address and register != 0:
+            self._cache[register] = (rawvalue, time.monotonic())
+            waiters = self._waiters.pop(register, [])
+            for writer, receiver in waiters:
+                writer.write(_telegram(self._address, receiver, register, rawvalue))
+        self._broadcast(telegram, exclude={writer for writer, _ in waiters})
+
+    def _broadcast(self, telegram, exclude=frozenset()):
+        for writer in self._clients - exclude:
+            if not writer.is_closing():
+                writer.write(telegram)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Share one RS485 adaptor between several clients")
+    parser.add_argument("--ip", type=str, default=DEFAULT_IP, help="IP address of the RS485 adaptor")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port of the RS485 adaptor")
+    parser.add_argument("--address", type=lambda x: int(x, 0), default=BUS_ADDRESSES["MB1"],
+                        help="Bus address of the mainboard (default 0x11)")
+    parser.add_argument("--listen-host", type=str, default="127.0.0.1", help="Address to serve clients on")
+    parser.add_argument("--listen-port", type=int, default=5020, help="Port to serve clients on")
+    parser.add_argument("--cache-age", type=float, default=PROXY_CACHE_AGE,
+                        help="Answer reads from values younger than this (s)")
+    args = parser.parse_args()
+    helios = HeliosBase(ip=args.ip, port=args.port, persistent=True, address=args.address)
+    proxy = HeliosProxy(helios, cache_age=args.cache_age)
+    await proxy.start(args.listen_host, args.listen_port)
+    helios.startListening(None)  # keeps the gateway connection up
+    try:
+        while True:
+            await asyncio.sleep(60)
+            print(proxy.stats)
+    finally:
+        await proxy.stop()
+        await helios.stopListening()
+        await helios.disconnect()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
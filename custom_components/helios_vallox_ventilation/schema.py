@@ -1,7 +1,35 @@
 import voluptuous as vol
 from homeassistant.const import CONF_IP_ADDRESS, CONF_PORT
 from homeassistant.helpers import config_validation as cv
-from .const import DOMAIN
+from .const import (
+    DOMAIN, DEFAULT_IDLE_TIMEOUT, DEFAULT_POLL_INTERVAL, MIN_POLL_INTERVAL, BUS_ADDRESSES,
+    DEFAULT_HISTORY_SIZE, DEFAULT_HISTORY_INTERVAL, FAULT_WATCH_INTERVAL
+)
+from .history import AGGREGATES
+
+# bus address of a mainboard (0x11 = MB1 ... 0x1F)
+MAINBOARD_ADDRESS = vol.All(vol.Coerce(int), vol.Range(min=BUS_ADDRESSES["MB1"], max=0x1F))
+
+# list of numbers, also as a comma separated string (e.g. from secrets.yaml)
+def _number_list(value):
+    if isinstance(value, str):
+        value = value.split(",")
+    return [float(number) for number in cv.ensure_list(value)]
+
+# house and ventilator data (see vent_conf.yaml), of the top level unit or of a device
+HOUSE_SCHEMA = vol.Schema(
+    {
+        vol.Optional("area"): vol.Coerce(float),
+        vol.Optional("volume"): vol.Coerce(float),
+        vol.Optional("isolation_factor", default=0.4): vol.Coerce(float),
+        vol.Optional("airflow_per_mode"): _number_list,
+        vol.Optional("power_per_mode"): _number_list,
+    }
+)
+
+# smoothing filters of sensors (see vent_conf.yaml)
+SENSOR_FILTERS = ("moving_average", "median")
+FILTER_OPTIONS = ("deadband", "min_publish_interval", "filter", "filter_window")
 
 # Configuration schema
 CONFIG_SCHEMA = vol.Schema(
@@ -10,6 +38,39 @@ CONFIG_SCHEMA = vol.Schema(
             {
                 vol.Required(CONF_IP_ADDRESS): cv.string,
                 vol.Required(CONF_PORT): cv.port,
+                vol.Optional("address", default=BUS_ADDRESSES["MB1"]): MAINBOARD_ADDRESS,
+                vol.Optional("devices", default=[]): vol.All(
+                    cv.ensure_list,
+                    [
+                        vol.Schema(
+                            {
+                                vol.Required("name"): cv.slug,
+                                vol.Optional(CONF_IP_ADDRESS): cv.string,
+                                vol.Optional(CONF_PORT): cv.port,
+                                vol.Optional("address", default=BUS_ADDRESSES["MB1"]): MAINBOARD_ADDRESS,
+                                vol.Optional("house"): HOUSE_SCHEMA,
+                            }
+                        )
+                    ],
+                ),
+                vol.Optional("persistent_connection", default=True): cv.boolean,
+                vol.Optional("idle_timeout", default=DEFAULT_IDLE_TIMEOUT): cv.positive_int,
+                vol.Optional("passive_listening", default=True): cv.boolean,
+                vol.Optional("verify_writes", default=False): cv.boolean,
+                vol.Optional("proxy_port"): cv.port,
+                vol.Optional("proxy_host", default="127.0.0.1"): cv.string,
+                vol.Optional("diagnostic_sensors", default=True): cv.boolean,
+                vol.Optional("fault_watch_interval", default=FAULT_WATCH_INTERVAL): vol.All(
+                    vol.Coerce(int), vol.Any(0, vol.Range(min=MIN_POLL_INTERVAL))
+                ),
+                vol.Optional("history_size", default=DEFAULT_HISTORY_SIZE): cv.positive_int,
+                vol.Optional("history_interval", default=DEFAULT_HISTORY_INTERVAL): vol.All(
+                    vol.Coerce(int), vol.Range(min=MIN_POLL_INTERVAL)
+                ),
+                vol.Optional("house", default={}): HOUSE_SCHEMA,
+                vol.Optional("poll_interval", default=DEFAULT_POLL_INTERVAL): vol.All(
+                    vol.Coerce(int), vol.Range(min=MIN_POLL_INTERVAL)
+                ),
                 vol.Optional("sensors", default=[]): vol.All(
                     cv.ensure_list,
                     [
@@ -24,6 +85,13 @@ CONFIG_SCHEMA = vol.Schema(
                                 vol.Optional("max_value"): vol.Coerce(float),
                                 vol.Optional("factory_setting"): vol.Coerce(float),
                                 vol.Optional("icon"): cv.icon,
+                                vol.Optional("poll_interval"): vol.All(
+                                    vol.Coerce(int), vol.Range(min=MIN_POLL_INTERVAL)
+                                ),
+                                vol.Optional("deadband"): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                                vol.Optional("min_publish_interval"): cv.positive_int,
+                                vol.Optional("filter"): vol.In(SENSOR_FILTERS),
+                                vol.Optional("filter_window", default=3): vol.All(vol.Coerce(int), vol.Range(min=2, max=20)),
                             }
                         )
                     ],
@@ -37,6 +105,9 @@ CONFIG_SCHEMA = vol.Schema(
                                 vol.Optional("description"): cv.string,
                                 vol.Optional("device_class"): cv.string,
                                 vol.Optional("icon"): cv.icon,
+                                vol.Optional("poll_interval"): vol.All(
+                                    vol.Coerce(int), vol.Range(min=MIN_POLL_INTERVAL)
+                                ),
                             }
                         )
                     ],
@@ -50,6 +121,9 @@ CONFIG_SCHEMA = vol.Schema(
                                 vol.Optional("description"): cv.string,
                                 vol.Optional("device_class"): cv.string,
                                 vol.Optional("icon"): cv.icon,
+                                vol.Optional("poll_interval"): vol.All(
+                                    vol.Coerce(int), vol.Range(min=MIN_POLL_INTERVAL)
+                                ),
                             }
                         )
                     ],
@@ -60,8 +134,33 @@ CONFIG_SCHEMA = vol.Schema(
     extra=vol.ALLOW_EXTRA,
 )
 
+# numbers stay int unless they have decimals (temperature setpoints in 0.1°C steps)
+def _number(value):
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
 # Service schema
 SERVICE_WRITE_VALUE_SCHEMA = vol.Schema({
     vol.Required("variable"): cv.string,
-    vol.Required("value"): vol.Coerce(int),
+    vol.Required("value"): _number,
+    vol.Optional("device"): cv.string,
+})
+SERVICE_DEVICE_SCHEMA = vol.Schema({
+    vol.Optional("device"): cv.string,
 })
+SERVICE_WRITE_VALUES_SCHEMA = vol.Schema({
+    vol.Required("values"): vol.Schema({cv.string: _number}),
+    vol.Optional("verify"): cv.boolean,
+    vol.Optional("device"): cv.string,
+})
+
+# History query (service and websocket command); start / end default to the whole history
+HISTORY_QUERY_FIELDS = {
+    vol.Required("variables"): vol.All(cv.ensure_list, [cv.string]),
+    vol.Optional("start"): cv.datetime,
+    vol.Optional("end"): cv.datetime,
+    vol.Optional("step"): cv.positive_int,
+    vol.Optional("aggregate", default="mean"): vol.In(AGGREGATES),
+    vol.Optional("device"): cv.string,
+}
+SERVICE_QUERY_HISTORY_SCHEMA = vol.Schema(HISTORY_QUERY_FIELDS)
@@ -2,7 +2,8 @@ import logging
 from homeassistant.helpers.entity import Entity
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.components.sensor import SensorEntity
-from .const import DOMAIN
+from homeassistant.const import EntityCategory
+from .const import DOMAIN, DIAGNOSTIC_SENSORS
 
 # _LOGGER = logging.getLogger(__name__)
 _LOGGER = logging.getLogger("helios_vallox.sensor")
@@ -11,30 +12,35 @@ _LOGGER = logging.getLogger("helios_vallox.sensor")
 async def async_setup_platform(hass, config, async_add_entities, discovery_info=None):
     if discovery_info is None:
         return
-    coordinator = hass.data[DOMAIN]["coordinator"]
+    coordinators = hass.data[DOMAIN]["coordinators"].values()
     entities = []
     sensor_config = discovery_info.get("sensors", [])
-    for sensor in sensor_config:
-        name = sensor.get("name")
-        if not name:
-            _LOGGER.warning("Sensor configuration missing 'name'. Skipping entry.")
-            continue
-        entities.append(
-            HeliosSensor(
-                name=name,
-                variable=name,
-                coordinator=coordinator,
-                icon=sensor.get("icon"),
-                unique_id=f"ventilation_{name}",
-                description=sensor.get("description"),
-                unit_of_measurement=sensor.get("unit_of_measurement"),
-                device_class=sensor.get("device_class"),
-                state_class=sensor.get("state_class"),
-                min_value=sensor.get("min_value"),
-                max_value=sensor.get("max_value"),
-                factory_setting=sensor.get("factory_setting"),
+    for coordinator in coordinators:  # one set of entities per device
+        for sensor in sensor_config:
+            name = sensor.get("name")
+            if not name:
+                _LOGGER.warning("Sensor configuration missing 'name'. Skipping entry.")
+                continue
+            entities.append(
+                HeliosSensor(
+                    name=name,
+                    variable=name,
+                    coordinator=coordinator,
+                    icon=sensor.get("icon"),
+                    unique_id=coordinator.unique_id(name),
+                    description=sensor.get("description"),
+                    unit_of_measurement=sensor.get("unit_of_measurement"),
+                    device_class=sensor.get("device_class"),
+                    state_class=sensor.get("state_class"),
+                    min_value=sensor.get("min_value"),
+                    max_value=sensor.get("max_value"),
+                    factory_setting=sensor.get("factory_setting"),
+                )
             )
-        )
+    if discovery_info.get("diagnostic_sensors", True):
+        for coordinator in coordinators:
+            for name, (path, unit) in DIAGNOSTIC_SENSORS.items():
+                entities.append(HeliosDiagnosticSensor(name, path, unit, coordinator))
     async_add_entities(entities)
     hass.data.setdefault("ventilation_entities", []).extend(entities)
 
@@ -56,7 +62,7 @@ class HeliosSensor(CoordinatorEntity, SensorEntity):
         factory_setting=None,
     ):
         super().__init__(coordinator.coordinator)
-        self._attr_name = f"Ventilation {name}"
+        self._attr_name = coordinator.entity_name(name)
         self._variable = variable
         self._coordinator = coordinator
         self._attr_icon = icon
@@ -81,6 +87,7 @@ class HeliosSensor(CoordinatorEntity, SensorEntity):
             "max_value": self._attr_max_value,
             "factory_setting": self._attr_factory_setting,
             "description": self._attr_description,
+            "stale": True if self._coordinator.stale else None,  # value from the snapshot
         }
         return {k: v for k, v in attributes.items() if v is not None}
 
@@ -89,6 +96,36 @@ class HeliosSensor(CoordinatorEntity, SensorEntity):
         await super().async_added_to_hass()
         self.async_write_ha_state()
 
-    # update entity
+    # update entity (only if its variable changed)
     def _handle_coordinator_update(self):
-        super()._handle_coordinator_update()
+        if self._coordinator.has_changed(self._variable):
+            super()._handle_coordinator_update()
+
+# diagnostic sensor class (bus statistics of HeliosBase)
+class HeliosDiagnosticSensor(CoordinatorEntity, SensorEntity):
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    def __init__(self, name, path, unit, coordinator):
+        super().__init__(coordinator.coordinator)
+        self._attr_name = coordinator.entity_name(name)
+        self._attr_unique_id = coordinator.unique_id(name)
+        self._attr_native_unit_of_measurement = unit
+        self._attr_state_class = "measurement" if unit else "total_increasing"
+        self._attr_icon = "mdi:timer-outline" if unit else "mdi:counter"
+        self._path = path
+        self._coordinator = coordinator
+
+    @property
+    def native_value(self):
+        value = self._coordinator.statistics
+        for key in self._path:
+            value = value.get(key) if isinstance(value, dict) else None
+        return value
+
+    # per-register figures for the latency sensors
+    @property
+    def extra_state_attributes(self):
+        if self._path[0] != "latency":
+            return None
+        registers = self._coordinator.statistics.get("register_latency", {})
+        return {varid: summary.get(self._path[1]) for varid, summary in registers.items()}
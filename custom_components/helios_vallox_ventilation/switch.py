@@ -10,24 +10,25 @@ _LOGGER = logging.getLogger("helios_vallox.switch")
 async def async_setup_platform(hass, config, async_add_entities, discovery_info=None):
     if discovery_info is None:
         return
-    coordinator = hass.data[DOMAIN]["coordinator"]
+    coordinators = hass.data[DOMAIN]["coordinators"].values()
     entities = []
     switch_config = discovery_info.get("switches", [])
-    for switch in switch_config:
-        name = switch.get("name")
-        if not name:
-            _LOGGER.warning("Switch configuration missing 'name'. Skipping entry.")
-            continue
-        entities.append(
-            HeliosSwitch(
-                name=name,
-                variable=name,
-                coordinator=coordinator,
-                icon=switch.get("icon"),
-                unique_id=f"ventilation_{name}",
-                description=switch.get("description"),
+    for coordinator in coordinators:  # one set of entities per device
+        for switch in switch_config:
+            name = switch.get("name")
+            if not name:
+                _LOGGER.warning("Switch configuration missing 'name'. Skipping entry.")
+                continue
+            entities.append(
+                HeliosSwitch(
+                    name=name,
+                    variable=name,
+                    coordinator=coordinator,
+                    icon=switch.get("icon"),
+                    unique_id=coordinator.unique_id(name),
+                    description=switch.get("description"),
+                )
             )
-        )
     async_add_entities(entities)
     hass.data.setdefault("ventilation_entities", []).extend(entities)
 
@@ -43,7 +44,7 @@ class HeliosSwitch(CoordinatorEntity, SwitchEntity):
         description=None,
     ):
         super().__init__(coordinator.coordinator)
-        self._attr_name = f"Ventilation {name}"
+        self._attr_name = coordinator.entity_name(name)
         self._variable = variable
         self._coordinator = coordinator
         self._attr_icon = icon
@@ -62,19 +63,19 @@ class HeliosSwitch(CoordinatorEntity, SwitchEntity):
     def extra_state_attributes(self):
         attributes = {
             "description": self._attr_description,
+            "stale": True if self._coordinator.stale else None,  # value from the snapshot
         }
         return {k: v for k, v in attributes.items() if v is not None}
 
-    # add entity
+    # add entity (CoordinatorEntity subscribes to updates)
     async def async_added_to_hass(self):
         await super().async_added_to_hass()
         self.async_write_ha_state()
-        self.async_on_remove(
-            self.coordinator.async_add_listener(self._handle_coordinator_update)
-        )
 
-    # update entity
+    # update entity (only if its variable changed)
     def _handle_coordinator_update(self):
+        if not self._coordinator.has_changed(self._variable):
+            return
         new_value = self.coordinator.data.get(self._variable)
         if new_value is not None:
             self._attr_is_on = new_value == "on" or new_value is True
@@ -0,0 +1,130 @@
+# End-to-end benchmark for vent_functions.py against the bus simulator
+# Runs readAllValues, readSingleValue and writeValue of HeliosBase against simulator.py
+# in several bus scenarios and reports throughput, p50/p99 latency and retries.
+# How to use:
+#    python3 benchmark.py                      # all scenarios
+#    python3 benchmark.py --scenario lossy --rounds 10 --json result.json
+# --fail-on-errors makes the run fail if any read or write did not succeed (for CI).
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from vent_functions import HeliosBase, READ_PLAN  # noqa: E402
+from simulator import BusSimulator  # noqa: E402
+
+# scenario name -> simulator settings
+SCENARIOS = {
+    "clean": {},
+    "busy": {"remote_interval": 1.0, "broadcast_interval": 2.0},
+    "lossy": {"remote_interval": 1.0, "broadcast_interval": 2.0, "drop_rate": 0.05, "jitter_rate": 0.02},
+}
+
+SINGLE_READS = ("fanspeed", "temperature_outdoor_air", "powerstate", "boost_remaining")
+WRITES = (("fanspeed", 3), ("fanspeed", 1), ("winter_mode", 0), ("winter_mode", 1))
+
+
+def _percentile(samples, percent):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return round(ordered[index] * 1000, 2)
+
+
+def _summary(samples, failures, units=1):
+    total = sum(samples)
+    return {
+        "count": len(samples),
+        "failures": failures,
+        "throughput_per_s": round(len(samples) * units / total, 2) if total else None,
+        "p50_ms": _percentile(samples, 50),
+        "p99_ms": _percentile(samples, 99),
+        "max_ms": round(max(samples) * 1000, 2) if samples else None,
+    }
+
+
+async def _timed(operation, samples):
+    start_time = time.perf_counter()
+    result = await operation
+    samples.append(time.perf_counter() - start_time)
+    return result
+
+
+async def run_scenario(name, rounds, seed=1):
+    simulator = BusSimulator(seed=seed, **SCENARIOS[name])
+    port = await simulator.start()
+    helios = HeliosBase(ip="127.0.0.1", port=port, persistent=True)
+    try:
+        await helios.connect()
+        await asyncio.sleep(0.1)
+        full, single, write = [], [], []
+        failures = {"full": 0, "single": 0, "write": 0}
+        for _ in range(rounds):
+            values = await _timed(helios.readAllValues(), full)
+            if not values or any(values.get(varname) is None for names in READ_PLAN.values() for varname in names):
+                failures["full"] += 1
+            for varname in SINGLE_READS:
+                value = await _timed(helios.readSingleValue(varname), single)
+                if not value or value.get(varname) is None:
+                    failures["single"] += 1
+            for varname, value in WRITES:
+                if not await _timed(helios.writeValue(varname, value), write):
+                    failures["write"] += 1
+        statistics = helios.busStatistics()
+        return {
+            "scenario": name,
+            # throughput of full reads in registers per second
+            "readAllValues": _summary(full, failures["full"], units=len(READ_PLAN)),
+            "readSingleValue": _summary(single, failures["single"]),
+            "writeValue": _summary(write, failures["write"]),
+            "requests": statistics["counters"]["requests"],
+            "retries": statistics["counters"]["retries"],
+            "timeouts": statistics["counters"]["timeouts"],
+            "read_failures": statistics["counters"]["read_failures"],
+            "simulator": dict(simulator.stats),
+        }
+    finally:
+        await helios.disconnect()
+        await simulator.stop()
+
+
+def _print(result):
+    print(f"\n=== {result['scenario']} ===  requests: {result['requests']}  retries: {result['retries']}  "
+          f"timeouts: {result['timeouts']}  read failures: {result['read_failures']}")
+    print(f"{'operation':<16}{'count':>7}{'failed':>8}{'per s':>10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for operation in ("readAllValues", "readSingleValue", "writeValue"):
+        summary = result[operation]
+        print(f"{operation:<16}{summary['count']:>7}{summary['failures']:>8}{summary['throughput_per_s'] or '-':>10}"
+              f"{summary['p50_ms'] or '-':>10}{summary['p99_ms'] or '-':>10}{summary['max_ms'] or '-':>10}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark HeliosBase against the bus simulator")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), action="append", help="Scenario(s) to run (default: all)")
+    parser.add_argument("--rounds", type=int, default=5, help="Full reads (plus single reads and writes) per scenario")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed of the simulator")
+    parser.add_argument("--json", type=str, help="Write results to this file")
+    parser.add_argument("--fail-on-errors", action="store_true", help="Exit with 1 if any operation failed")
+    args = parser.parse_args()
+    results = []
+    for name in args.scenario or SCENARIOS:
+        result = await run_scenario(name, args.rounds, args.seed)
+        _print(result)
+        results.append(result)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+    failed = sum(result[operation]["failures"] for result in results
+                 for operation in ("readAllValues", "readSingleValue", "writeValue"))
+    return 1 if args.fail_on_errors and failed else 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,182 @@
+# RS485 gateway simulator for Helios / Vallox ventilation devices
+# Emulates a mainboard behind a TCP/RS485 adaptor, so vent_functions.py can be tested
+# and benchmarked without hardware. All connected clients share one simulated bus.
+# How to use:
+#    python3 simulator.py --port 5020 --remote-interval 2 --broadcast-interval 5
+# Then point the integration or the CLI of vent_functions.py to 127.0.0.1:5020.
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from const import REGISTERS_AND_COILS, BUS_ADDRESSES  # noqa: E402
+from vent_functions import TelegramFramer  # noqa: E402
+
+_LOGGER = logging.getLogger("helios_vallox.simulator")
+
+# register contents of a running unit (taken from sniffer_example.log where available)
+DEFAULT_REGISTERS = {varid: 0x00 for varid in {vardef["varid"] for vardef in REGISTERS_AND_COILS.values()}}
+DEFAULT_REGISTERS.update({
+    0x29: 0x01,  # fanspeed 1
+    0xA9: 0x01,  # initial fanspeed 1
+    0xA5: 0xFF,  # max fanspeed 8
+    0x32: 0x68,  # outdoor air 1.0°C
+    0x33: 0x7D,  # exhaust air 7.7°C
+    0x34: 0xA2,  # extract air 20.6°C
+    0x35: 0x98,  # supply air 16.8°C
+    0xA3: 0x09,  # powerstate + winter mode
+    0xAF: 0x84,  # bypass setpoint 10°C
+    0xA7: 0x5B,  # preheat setpoint -3°C
+    0xA8: 0x6E,  # defrost setpoint 3°C
+    0xB2: 0x09,  # defrost hysteresis 3
+    0xAA: 0x20,  # normal boost mode
+    0xB0: 0x64,  # input fan 100%
+    0xB1: 0x64,  # output fan 100%
+    0xA6: 0x04,  # service interval 4 months
+    0xAB: 0x02,  # service due in 2 months
+})
+
+REMOTE_POLLED = (0xA3, 0x29, 0x35, 0x71)                    # registers a remote asks for
+MAINBOARD_BROADCAST = (0x2B, 0x2C, 0x35, 0x34, 0x32, 0x33)  # registers the mainboard sends to FB*
+
+
+def _telegram(sender, receiver, register, value):
+    telegram = bytearray((0x01, sender, receiver, register, value, 0))
+    telegram[5] = sum(telegram[:5]) & 0xFF
+    return bytes(telegram)
+
+
+class BusSimulator:
+
+    def __init__(self, registers=None, latency=0.003, drop_rate=0.0, jitter_rate=0.0,
+                 remote_interval=None, broadcast_interval=None, seed=None):
+        self.registers = dict(DEFAULT_REGISTERS if registers is None else registers)
+        self.latency = latency                          # mainboard response time (s)
+        self.drop_rate = drop_rate                      # share of unanswered read requests
+        self.jitter_rate = jitter_rate                  # share of frames preceded by garbage
+        self.remote_interval = remote_interval          # s between remote polling bursts
+        self.broadcast_interval = broadcast_interval    # s between mainboard broadcasts
+        self.address = BUS_ADDRESSES["MB1"]
+        self.stats = dict.fromkeys(("requests", "responses", "dropped", "writes", "crc_errors", "frames"), 0)
+        self._random = random.Random(seed)
+        self._clients = set()
+        self._server = None
+        self._tasks = []
+        self._bus_lock = asyncio.Lock()  # one frame on the bus at a time
+
+    async def start(self, host="127.0.0.1", port=0):
+        self._server = await asyncio.start_server(self._handleClient, host, port)
+        if self.remote_interval:
+            self._tasks.append(asyncio.create_task(self._remoteTraffic()))
+        if self.broadcast_interval:
+            self._tasks.append(asyncio.create_task(self._mainboardBroadcasts()))
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        for writer in list(self._clients):
+            writer.close()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    # put a frame on the bus: every client but the sender receives it
+    async def _transmit(self, frame, origin=None):
+        async with self._bus_lock:
+            if self.jitter_rate and self._random.random() < self.jitter_rate:
+                frame = bytes(self._random.randrange(2, 256) for _ in range(self._random.randint(1, 3))) + frame
+            self.stats["frames"] += 1
+            for writer in list(self._clients):
+                if writer is not origin:
+                    writer.write(frame)
+
+    async def _handleClient(self, reader, writer):
+        self._clients.add(writer)
+        framer = TelegramFramer()
+        try:
+            while data := await reader.read(256):
+                errors = framer.crc_failures
+                for telegram in framer.feed(data):
+                    await self._transmit(telegram, origin=writer)  # other clients see it too
+                    await self._handleTelegram(telegram)
+                self.stats["crc_errors"] += framer.crc_failures - errors
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._clients.discard(writer)
+            writer.close()
+
+    # mainboard: answer read requests, store written registers
+    async def _handleTelegram(self, telegram):
+        sender, receiver, register, value = telegram[1], telegram[2], telegram[3], telegram[4]
+        if receiver not in (self.address, BUS_ADDRESSES["MB*"]):
+            return
+        if register == 0:
+            self.stats["requests"] += 1
+            if self._random.random() < self.drop_rate:
+                self.stats["dropped"] += 1
+                return
+            await asyncio.sleep(self.latency)
+            await self._transmit(_telegram(self.address, sender, value, self.registers.get(value, 0)))
+            self.stats["responses"] += 1
+        elif register != 0x06:  # 06h is never written
+            self.stats["writes"] += 1
+            self.registers[register] = value
+
+    # a remote control polling the mainboard in short bursts
+    async def _remoteTraffic(self):
+        remote = BUS_ADDRESSES["FB1"]
+        while True:
+            await asyncio.sleep(self.remote_interval)
+            for register in REMOTE_POLLED:
+                await self._transmit(_telegram(remote, self.address, 0, register))
+                await asyncio.sleep(self.latency)
+                await self._transmit(_telegram(self.address, remote, register, self.registers.get(register, 0)))
+                await asyncio.sleep(0.004)
+
+    # the mainboard broadcasting sensor values to all remotes
+    async def _mainboardBroadcasts(self):
+        while True:
+            await asyncio.sleep(self.broadcast_interval)
+            for register in MAINBOARD_BROADCAST:
+                await self._transmit(_telegram(self.address, BUS_ADDRESSES["FB*"], register, self.registers.get(register, 0)))
+                await asyncio.sleep(0.1)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Simulate a Helios / Vallox mainboard behind an RS485 adaptor")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=5020, help="Port to listen on")
+    parser.add_argument("--latency", type=float, default=3, help="Mainboard response time in ms")
+    parser.add_argument("--drop", type=float, default=0.0, help="Share of unanswered read requests (0..1)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Share of frames preceded by garbage bytes (0..1)")
+    parser.add_argument("--remote-interval", type=float, default=None, help="Seconds between remote polling bursts")
+    parser.add_argument("--broadcast-interval", type=float, default=None, help="Seconds between mainboard broadcasts")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed")
+    args = parser.parse_args()
+    simulator = BusSimulator(
+        latency=args.latency / 1000, drop_rate=args.drop, jitter_rate=args.jitter,
+        remote_interval=args.remote_interval, broadcast_interval=args.broadcast_interval, seed=args.seed,
+    )
+    port = await simulator.start(args.host, args.port)
+    print(f"Simulating mainboard on {args.host}:{port} (Ctrl-C to stop)")
+    try:
+        while True:
+            await asyncio.sleep(10)
+            print(simulator.stats)
+    finally:
+        await simulator.stop()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -1,240 +1,239 @@
 # Packet sniffer for Helios / Vallox ventilation devices
-# How to use:
-# At first, change the IP and port at the end of this file to the actual settings of your RS485 adaptor.
-# Then run the file at a command line (press Ctrl-C when done):
-#    python3 sniffer.py
-
+# Frames the bus traffic of the RS485 adaptor, prints it decoded and/or writes it to a compact
+# binary capture (timestamp + six raw bytes per telegram) that can be replayed later.
+# How to use (press Ctrl-C when done):
+#    python3 sniffer.py --ip 192.168.178.36 --port 502                 # print decoded traffic
+#    python3 sniffer.py --capture bus.hvc --quiet                      # capture only, rotated at 10 MB
+#    python3 sniffer.py --log hex.log                                  # text log like before
+#    python3 sniffer.py --replay bus.hvc                               # print a capture
+#    python3 sniffer.py --replay bus.hvc --benchmark                   # decode speed of HeliosBase
+#    python3 sniffer.py --replay bus.hvc --serve 5020 --speed 10       # act as adaptor for HA / the CLI
+
+import argparse
+import asyncio
 import logging
+import os
 import socket
-import array
-
-
-# log settings
-logging.basicConfig(
-    filename='hex.log',  # file
-    # level=logging.DEBUG,  # uncomment to set alternative log level
-    level=logging.INFO,     # set log level
-    format='%(asctime)s       %(message)s'  # set log format
-)
-logger = logging.getLogger("")
-
-
-# Mapping: Sender & receiver
-SENDER_MAP = {
-    0x11: "MB1",
-    0x21: "FB1",
-    0x2D: "HA1",
-    0x2E: "HA2",
-    0x2F: "SH_"
-}
-
-RECEIVER_MAP = {
-    0x10: "MB*",
-    0x11: "MB1",
-    0x20: "FB*",
-    0x21: "FB1",
-    0x2D: "HA1",
-    0x2E: "HA2",
-    0x2F: "SH_"
-}
-
-# mapping for registers and coils
-CONST_MAP_VARIABLES_TO_ID = {
-    # Current fanspeed (EC300Pro: 1..8)
-    "fanspeed"          : {"varid" : 0x29, 'type': 'fanspeed',     'bitposition': -1, 'read': True, 'write': True  },
-    # Fanspeed after switching on
-    "initial_fanspeed"  : {"varid" : 0xA9, 'type': 'fanspeed',     'bitposition': -1, 'read': True, 'write': True  },
-    # Maximum settable fanspeed
-    "max_fanspeed"      : {"varid" : 0xA5, 'type': 'fanspeed',     'bitposition': -1, 'read': True, 'write': True  },
-    # NTC5K sensors: outside air temperature
-    "temperature_outdoor_air"      : {"varid" : 0x32, 'type': 'temperature',  'bitposition': -1, 'read': True, 'write': False },
-    # NTC5K sensors: supply air temperature
-    "temperature_supply_air"        : {"varid" : 0x35, 'type': 'temperature',  'bitposition': -1, 'read': True, 'write': False },
-    # NTC5K sensors: return air temperature
-    "temperature_extract_air"       : {"varid" : 0x34, 'type': 'temperature',  'bitposition': -1, 'read': True, 'write': False },
-    # NTC5K sensors: discharge air temperature
-    "temperature_exhaust_air"      : {"varid" : 0x33, 'type': 'temperature',  'bitposition': -1, 'read': True, 'write': False },
-    # various coils in register 0xA3 that are displayed on the remote controls (0..3 read/write, 4..7 readonly)
-    # FB LED1: on/off Caution: Remotes will not be switched back on automatically; initial_fanspeed set if done manually.
-    "powerstate"        : {"varid" : 0xA3, 'type': 'bit',          'bitposition':  0, 'read': True, 'write': True  },
-    # FB LED2: CO2 warning
-    "co2_indicator"     : {"varid" : 0xA3, 'type': 'bit',          'bitposition':  1, 'read': True, 'write': False },
-    # FB LED3: Humidity warning
-    "rh_indicator"      : {"varid" : 0xA3, 'type': 'bit',          'bitposition':  2, 'read': True, 'write': False },
-    # FB LED4: 0 = summer mode with bypass, 1 = wintermode with heat regeneration (LED is on in winter mode)
-    "summer_winter_mode": {"varid" : 0xA3, 'type': 'bit',          'bitposition':  3, 'read': True, 'write': False },
-    # FB icon 1: "Clean filter" warning
-    "clean_filter"      : {"varid" : 0xA3, 'type': 'bit',          'bitposition':  4, 'read': True, 'write': False },
-    # FB icon 2 2: Pre-/Post heating active
-    "post_heating_on"   : {"varid" : 0xA3, 'type': 'bit',          'bitposition':  5, 'read': True, 'write': False },
-    # FB icon 3: Error / fault
-    "fault_detected"    : {"varid" : 0xA3, 'type': 'bit',          'bitposition':  6, 'read': True, 'write': False },
-    # FB icon 4: Service request
-    "service_requested" : {"varid" : 0xA3, 'type': 'bit',          'bitposition':  7, 'read': True, 'write': False },
-    # Summer mode: Activate bypass from this temperature onwards if fresh air °C (outside) < extract air °C (inside)
-    "bypass_setpoint"   : {"varid" : 0xAF, 'type': 'temperature',  'bitposition': -1, 'read': True, 'write': True  },
-    # Activation temperature for pre / post heating
-    "preheat_setpoint"  : {"varid" : 0xA7, 'type': 'temperature',  'bitposition': -1, 'read': True, 'write': True  },
-    # Pre / post heating is off (0) / on (1)
-    "preheat_status"    : {"varid" : 0x70, 'type': 'bit',          'bitposition':  7, 'read': True, 'write': True  },
-    # Frost protection - switch off fresh air ventilator and heating below this temperature; -6 ... +15°C
-    "defrost_setpoint"  : {"varid" : 0xA8, 'type': 'temperature',  'bitposition': -1, 'read': True, 'write': True  },
-    # Frost protection hysteresis - when to switch it on again (defrost_setpoint + (this_value/3)) --> 0x03 = 1°C
-#    "defrost_hysteresis": {"varid" : 0xB2, 'type': 'dec_special',  'bitposition': -1, 'read': True, 'write': True  },
-    "defrost_hysteresis": {"varid" : 0xB2, 'type': 'dec',  'bitposition': -1, 'read': True, 'write': True  },
-    # Boost mode: 0=fireplace  (ignition - no exhaust air in the first 15 minutes of boost); 1=normal boost mode
-    "boost_mode"        : {"varid" : 0xAA, 'type': 'bit',          'bitposition':  5, 'read': True, 'write': True  },
-    # Switch boost on for 45 minutes (set to 1; will be reset automatically)
-    "boost_on_switch"   : {"varid" : 0x71, 'type': 'bit',          'bitposition':  5, 'read': True, 'write': True  },
-    # Current boost status (off/on)
-    "boost_status"      : {"varid" : 0x71, 'type': 'bit',          'bitposition':  6, 'read': True, 'write': False },
-    # Remaining minutes of boost if on
-    "boost_remaining"   : {"varid" : 0x79, 'type': 'dec',          'bitposition': -1, 'read': True, 'write': False },
-    # Fresh air vetilator off; set to 1 to switch off; requires to be set twice
-    "input_fan_off"     : {"varid" : 0x08, 'type': 'bit',          'bitposition':  3, 'read': True, 'write': True  },
-    # Exhaust air vetilator off; set to 1 to switch off; requires to be set twice
-    "output_fan_off"    : {"varid" : 0x08, 'type': 'bit',          'bitposition':  5, 'read': True, 'write': True  },
-	# rpm of fresh air ventilator (65...100% - pneumatic calibration; default=100)
-    "input_fan_percent" : {"varid" : 0xB0, 'type': 'dec',          'bitposition': -1, 'read': True, 'write': True  },
-	# rpm of exhaust air ventilator (65...100% - pneumatic calibration; default=100)
-    "output_fan_percent": {"varid" : 0xB1, 'type': 'dec',          'bitposition': -1, 'read': True, 'write': True  },   
-    # Service reminder interval in months (used after reset f service reminder)
-    "service_interval"  : {"varid" : 0xA6, 'type': 'dec',          'bitposition': -1, 'read': True, 'write': True  },
-    # Remaining months for current service reminder
-    "service_due_months": {"varid" : 0xAB, 'type': 'dec',          'bitposition': -1, 'read': True, 'write': True  },
-    # Error / fault register. 0 = no fault. see COMPONENT_FAULTS below
-    "fault_number"      : {"varid" : 0x36, 'type': 'dec',          'bitposition': -1, 'read': True, 'write': False }
-}
-
-CONST_TEMPERATURE = array.array(
-    "i",
-    [
-    -74,-70,-66,-62,-59,-56,-54,-52,-50,-48,-47,-46,-44,-43,-42,-41,-40,-39,-38,-37,-36,
-    -35,-34,-33,-33,-32,-31,-30,-30,-29,-28,-28,-27,-27,-26,-25,-25,-24,-24,-23,-23,-22,
-    -22,-21,-21,-20,-20,-19,-19,-19,-18,-18,-17,-17,-16,-16,-16,-15,-15,-14,-14,-14,-13,
-    -13,-12,-12,-12,-11,-11,-11,-10,-10,-9,-9,-9,-8,-8,-8,-7,-7,-7,-6,-6,-6,-5,-5,-5,-4,
-    -4,-4,-3,-3,-3,-2,-2,-2,-1,-1,-1,-1,0,0,0,1,1,1,2,2,2,3,3,3,4,4,4,5,5,5,5,6,6,6,7,7,
-    7,8,8,8,9,9,9,10,10,10,11,11,11,12,12,12,13,13,13,14,14,14,15,15,15,16,16,16,17,17,
-    18,18,18,19,19,19,20,20,21,21,21,22,22,22,23,23,24,24,24,25,25,26,26,27,27,27,28,28,
-    29,29,30,30,31,31,32,32,33,33,34,34,35,35,36,36,37,37,38,38,39,40,40,41,41,42,43,43,
-    44,45,45,46,47,48,48,49,50,51,52,53,53,54,55,56,57,59,60,61,62,63,65,66,68,69,71,73,
-    75,77,79,81,82,86,90,93,97,100,100,100,100,100,100,100,100,100
-    ]
-)
-
-# Mapping: fanspeed
-CONST_FANSPEED = {
-    1: 1,
-    3: 2,
-    7: 3,
-    15: 4,
-    31: 5,
-    63: 6,
-    127: 7,
-    255: 8,
-}
-
-def adjust_abbreviations(text):
-    # replace long names with abbreviations
-    return (
-        text.replace("Mainboard_1", "MB1")
-        .replace("Remote_1", "FB1")
-        .replace("Alle_Remotes", "FB*")
-        .replace("Remote_Software", "_SH")
-        .replace("-->", ">")
-    )
-
-def resolve_variable(varid, data_byte):
-    # get variables based on ID
-    for var_name, details in CONST_MAP_VARIABLES_TO_ID.items():
-        if details["varid"] == varid:
-            var_type = details["type"]
-            if var_type == "bit":
-                bit_position = details["bitposition"]
-                value = "1" if (data_byte & (1 << bit_position)) else "0"
-                return f"{var_name} (Bit {bit_position}): {value}"
-            elif var_type == "temperature":
-                temperature_index = data_byte
-                if 0 <= temperature_index < len(CONST_TEMPERATURE):
-                    temperature = CONST_TEMPERATURE[temperature_index]
-                    return f"{var_name}: {temperature}°C"
-            elif var_type == "fanspeed":
-                fanspeed = CONST_FANSPEED.get(data_byte, "Unbekannt")
-                return f"{var_name}: {fanspeed}"
-            elif var_type == "dec":
-                return f"{var_name}: {data_byte}"
-            return f"{var_name}"
-    return f"unknown variable 0x{varid:02x}"
-
-def find_variable_name(varid):
-    # return variable name or 'Unbekannt / unknown'
-    for var_name, details in CONST_MAP_VARIABLES_TO_ID.items():
-        if details["varid"] == varid:
-            return var_name
-    return f"Unknown variable 0x{varid:02x}"
-
-def connect_and_receive(ip, port):
-    # make connection to device and start reveiving data
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from const import BUS_ADDRESSES, DEFAULT_IP, DEFAULT_PORT, REGISTERS_AND_COILS  # noqa: E402
+from vent_functions import HeliosBase, TelegramFramer, decodeRegister  # noqa: E402
+
+CAPTURE_MAGIC = b"HVC1"               # file header of a capture
+CAPTURE_RECORD = struct.Struct("<d6s")  # unix time, raw telegram (14 bytes per telegram)
+
+ADDRESS_NAMES = {address: name for name, address in BUS_ADDRESSES.items()}
+ADDRESS_NAMES[0x2D] = "HA1"
+REGISTER_NAMES = {}
+for _varname, _vardef in REGISTERS_AND_COILS.items():
+    REGISTER_NAMES.setdefault(_vardef["varid"], _varname)
+
+
+# one line of text per telegram
+def describe(telegram):
+    sender, receiver, register, value = telegram[1], telegram[2], telegram[3], telegram[4]
+    route = f"{ADDRESS_NAMES.get(sender, '???')}>{ADDRESS_NAMES.get(receiver, '???')}".ljust(10)
+    if register == 0:  # read request (byte 5 = register)
+        text = f"request {REGISTER_NAMES.get(value, f'unknown variable 0x{value:02x}')}"
+    else:
+        values = decodeRegister(register, value)
+        text = ", ".join(f"{k}: {v}" for k, v in values.items()) or f"unknown variable 0x{register:02x}"
+    return f"{telegram.hex(' ').ljust(20)} {route}{text}"
+
+
+# binary capture with size based rotation (bus.hvc, bus.hvc.1, ... bus.hvc.<backups>)
+class CaptureWriter:
+
+    def __init__(self, filename, max_bytes=10 * 1024 * 1024, backups=5):
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._file = None
+        self._open()
+
+    def _open(self):
+        self._file = open(self.filename, "ab")
+        if self._file.tell() == 0:
+            self._file.write(CAPTURE_MAGIC)
+
+    def _rotate(self):
+        self._file.close()
+        for index in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.filename}.{index}"):
+                os.replace(f"{self.filename}.{index}", f"{self.filename}.{index + 1}")
+        if self.backups:
+            os.replace(self.filename, f"{self.filename}.1")
+        else:
+            os.remove(self.filename)
+        self._open()
+
+    def write(self, timestamp, telegram):
+        if self.max_bytes and self._file.tell() + CAPTURE_RECORD.size > self.max_bytes:
+            self._rotate()
+        self._file.write(CAPTURE_RECORD.pack(timestamp, telegram))
+
+    def close(self):
+        self._file.close()
+
+
+# (timestamp, telegram) of a capture file or a text log of the old sniffer (hex.log)
+def read_capture(filename):
+    with open(filename, "rb") as file:
+        data = file.read()
+    if data[:len(CAPTURE_MAGIC)] != CAPTURE_MAGIC:
+        return read_text_log(data.decode(errors="replace"))
+    body = memoryview(data)[len(CAPTURE_MAGIC):]
+    usable = len(body) - len(body) % CAPTURE_RECORD.size  # ignore a cut off last record
+    return list(CAPTURE_RECORD.iter_unpack(body[:usable]))
+
+
+# lines like "2025-03-01 23:04:01,975       01 21 11 00 a3 d6    FB1>MB1   request powerstate"
+def read_text_log(text):
+    records = []
+    for line in text.splitlines():
+        try:
+            stamp, milliseconds = line[:23].split(",")
+            timestamp = time.mktime(time.strptime(stamp, "%Y-%m-%d %H:%M:%S")) + int(milliseconds) / 1000
+            telegram = bytes.fromhex(" ".join(line[23:].split()[:6]))
+        except ValueError:
+            continue
+        if len(telegram) == 6:
+            records.append((timestamp, telegram))
+    return records
+
+
+def sniff(ip, port, capture=None, logger=None, quiet=False):
+    framer = TelegramFramer()
+    buffer = bytearray(1024)
+    view = memoryview(buffer)
+    count = 0
+    with socket.create_connection((ip, port)) as client_socket:
+        while True:
+            size = client_socket.recv_into(buffer)
+            if not size:
+                break
+            now = time.time()
+            skipped = framer.skipped
+            for telegram in framer.feed(view[:size]):
+                count += 1
+                if capture is not None:
+                    capture.write(now, telegram)
+                if not quiet or logger is not None:
+                    line = describe(telegram)
+                    if not quiet:
+                        print(line)
+                    if logger is not None:
+                        logger.info(line)
+            if framer.skipped != skipped and not quiet:
+                print(f"{'':20} jitter: {framer.skipped - skipped} bytes")
+            if quiet and count % 1000 == 0 and count:
+                print(f"{count} telegrams, {framer.skipped} jitter bytes, {framer.crc_failures} crc failures")
+
+
+def replay_print(records):
+    for timestamp, telegram in records:
+        seconds, milliseconds = divmod(round(timestamp * 1000), 1000)
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(seconds)) + f",{milliseconds:03d}"
+        print(f"{stamp}       {describe(telegram)}")
+
+
+# feed a capture into the framer and decoders of HeliosBase as fast as possible
+def replay_benchmark(records, rounds=10):
+    decoded = []
+    helios = HeliosBase()  # no connection: its protocol layer is called directly
+    helios.addMainboard(BUS_ADDRESSES["MB1"]).listener = decoded.append
+    data = b"".join(telegram for _, telegram in records)
+    start_time = time.perf_counter()
+    for _ in range(rounds):
+        helios._dataReceived(data)
+    duration = time.perf_counter() - start_time
+    telegrams = len(records) * rounds
+    print(f"{telegrams} telegrams in {duration:.3f}s: {telegrams / duration:,.0f} telegrams/s, "
+          f"{len(decoded)} value updates")
+    print(helios.busStatistics()["counters"])
+
+
+# act as RS485 adaptor: send the captured traffic to every client, in its original timing
+async def replay_serve(records, host, port, speed, loop_forever):
+    clients = set()
+
+    async def handle_client(reader, writer):
+        clients.add(writer)
+        try:
+            while await reader.read(256):
+                pass  # requests of clients are not answered
+        finally:
+            clients.discard(writer)
+            writer.close()
+
+    server = await asyncio.start_server(handle_client, host, port)
+    print(f"Replaying {len(records)} telegrams on {host}:{port} (speed x{speed}, Ctrl-C to stop)")
     try:
-        client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        client_socket.connect((ip, port))
-        buffer = b""
         while True:
-            data = client_socket.recv(1024)
-            if not data:
+            previous = records[0][0] if records else 0
+            for timestamp, telegram in records:
+                await asyncio.sleep(max(0.0, timestamp - previous) / speed)
+                previous = timestamp
+                for writer in list(clients):
+                    writer.write(telegram)
+            if not loop_forever:
                 break
-            buffer += data
-
-            while len(buffer) >= 6:  # standard telegram: 6 Bytes
-                if buffer[0] != 0x01:
-                    # remove invalid data (jitter)
-                    jitter_end = buffer.find(b'\x01')  # find next 0x01 = telegram start
-                    if jitter_end == -1:
-                        jitter_end = len(buffer)
-                    jitter = buffer[:jitter_end]
-                    buffer = buffer[jitter_end:]
-                    jitter_hex = " ".join(f"{byte:02x}" for byte in jitter)
-                    print(f"{jitter_hex.ljust(20)} jitter")
-                    logger.info(f"{jitter_hex.ljust(20)} jitter")
-                    continue
-
-                sender = buffer[1]
-                receiver = buffer[2]
-                variable_id = buffer[3]
-                data_byte = buffer[4]
-                        
-                try:
-                    sender_text = SENDER_MAP[sender]
-                except:
-                    sender_text = '???'
-
-                try:
-                    receiver_text = RECEIVER_MAP[receiver]
-                except:
-                    receiver_text = '???'
-
-                sender_receiver = f"{sender_text}>{receiver_text}".ljust(10)
-
-                if variable_id == 0x00:
-                    # its a read request (byte 5 = variable)
-                    variable_name = find_variable_name(data_byte)
-                    formatted_line = " ".join(f"{byte:02x}" for byte in buffer[:6])
-                    print(f"{formatted_line.ljust(20)} {sender_receiver}request {variable_name}")
-                    logger.info(f"{formatted_line.ljust(20)} {sender_receiver}request {variable_name}")
-                else:
-                    # its data
-                    variable_text = resolve_variable(variable_id, data_byte).replace(",", "")
-                    formatted_line = " ".join(f"{byte:02x}" for byte in buffer[:6])
-                    print(f"{formatted_line.ljust(20)} {sender_receiver}{variable_text}")
-                    logger.info(f"{formatted_line.ljust(20)} {sender_receiver}{variable_text}")
-
-                buffer = buffer[6:]
+    finally:
+        server.close()
+        await server.wait_closed()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sniff, capture and replay Helios / Vallox bus traffic")
+    parser.add_argument("--ip", type=str, default=DEFAULT_IP, help="IP address of the RS485 adaptor")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port of the RS485 adaptor")
+    parser.add_argument("--capture", type=str, help="Write a binary capture to this file")
+    parser.add_argument("--rotate-mb", type=float, default=10, help="Rotate the capture at this size (0 = never)")
+    parser.add_argument("--backups", type=int, default=5, help="Number of rotated captures to keep")
+    parser.add_argument("--log", type=str, help="Write decoded text to this log file")
+    parser.add_argument("--quiet", action="store_true", help="Do not print telegrams")
+    parser.add_argument("--replay", type=str, help="Replay this capture instead of sniffing")
+    parser.add_argument("--benchmark", action="store_true", help="Replay: measure framing and decoding speed")
+    parser.add_argument("--serve", type=int, metavar="PORT", help="Replay: serve the traffic as adaptor on this port")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Replay: address to serve on")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay: time factor for --serve")
+    parser.add_argument("--loop", action="store_true", help="Replay: start over at the end (--serve)")
+    args = parser.parse_args()
+
+    if args.replay:
+        records = read_capture(args.replay)
+        if args.benchmark:
+            replay_benchmark(records)
+        elif args.serve:
+            asyncio.run(replay_serve(records, args.host, args.serve, args.speed, args.loop))
+        else:
+            replay_print(records)
+        return
+
+    logger = None
+    if args.log:
+        logger = logging.getLogger("helios_vallox.sniffer")
+        handler = logging.FileHandler(args.log)
+        handler.setFormatter(logging.Formatter('%(asctime)s       %(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    capture = None
+    if args.capture:
+        capture = CaptureWriter(args.capture, int(args.rotate_mb * 1024 * 1024), args.backups)
+    try:
+        sniff(args.ip, args.port, capture, logger, args.quiet)
     except Exception as e:
         print(f"Error: {e}")
     finally:
-        client_socket.close()
+        if capture is not None:
+            capture.close()
 
 if __name__ == "__main__":
-    server_ip = "192.168.178.36"
-    server_port = 502
-    connect_and_receive(server_ip, server_port)
+    try:
+        main()
+    except KeyboardInterrupt:
+        pass
@@ -1,131 +1,793 @@
 import socket
+import asyncio
+import bisect
+import contextlib
+import heapq
+import itertools
 import logging
-import threading
+import math
 import time
 import argparse
-import select
 import random
 
 try:
     from .const import ( # HA
         REGISTERS_AND_COILS,
         NTC5K_TEMPERATURES,
+        TEMPERATURE_RESOLUTION,
         BUS_ADDRESSES,
         FANSPEEDS,
         DEFAULT_IP,
         DEFAULT_PORT,
-        COMPONENT_FAULTS
+        DEFAULT_IDLE_TIMEOUT,
+        RECONNECT_BACKOFF_MIN,
+        RECONNECT_BACKOFF_MAX,
+        WRITE_VERIFY_RETRIES,
+        SLOT_SILENCE_DEFAULT,
+        SLOT_SILENCE_MIN,
+        SLOT_SILENCE_MAX,
+        SLOT_TRANSACTION_TIME,
+        RETRY_BACKOFF_BASE,
+        RETRY_BACKOFF_MAX,
+        RESPONSE_TIMEOUT_MIN,
+        RESPONSE_TIMEOUT_MAX,
+        COMPONENT_FAULTS,
+        DIN_AIRFLOW_FACTORS,
+        BUS_PRIORITY_WRITE,
+        BUS_PRIORITY_READ,
+        BUS_PRIORITY_POLL
     )
 except ImportError:
     from const import ( # Shell / CLI for testing
         REGISTERS_AND_COILS,
         NTC5K_TEMPERATURES,
+        TEMPERATURE_RESOLUTION,
         BUS_ADDRESSES,
         FANSPEEDS,
         DEFAULT_IP,
         DEFAULT_PORT,
-        COMPONENT_FAULTS
+        DEFAULT_IDLE_TIMEOUT,
+        RECONNECT_BACKOFF_MIN,
+        RECONNECT_BACKOFF_MAX,
+        WRITE_VERIFY_RETRIES,
+        SLOT_SILENCE_DEFAULT,
+        SLOT_SILENCE_MIN,
+        SLOT_SILENCE_MAX,
+        SLOT_TRANSACTION_TIME,
+        RETRY_BACKOFF_BASE,
+        RETRY_BACKOFF_MAX,
+        RESPONSE_TIMEOUT_MIN,
+        RESPONSE_TIMEOUT_MAX,
+        COMPONENT_FAULTS,
+        DIN_AIRFLOW_FACTORS,
+        BUS_PRIORITY_WRITE,
+        BUS_PRIORITY_READ,
+        BUS_PRIORITY_POLL
     )
 
+# group readable variables by register: each register is requested only once per
+# full read, all variables (e.g. the eight coils of 0xA3) are decoded from that byte
+def buildReadPlan(varnames=None):
+    plan = {}
+    for varname in (varnames if varnames is not None else REGISTERS_AND_COILS):
+        vardef = REGISTERS_AND_COILS[varname]
+        if vardef["read"]:
+            plan.setdefault(vardef["varid"], []).append(varname)
+    return plan
+
+READ_PLAN = buildReadPlan()
+
+# registers with at least one writable variable (never 06h, see _validateBeforeWrite)
+WRITABLE_REGISTERS = frozenset(
+    vardef["varid"] for vardef in REGISTERS_AND_COILS.values() if vardef["write"] == True and vardef["varid"] != 0x06
+)
+
+# NTC5k curve with sub-degree resolution: NTC5K_TEMPERATURES is rounded to whole degrees,
+# so a degree is anchored at the middle of the raw values sharing it, and the raw values
+# in between are interpolated linearly. Raw values above the saturation stay at 100.
+def buildTemperatureCurve(table=NTC5K_TEMPERATURES, resolution=TEMPERATURE_RESOLUTION):
+    saturation = table.index(max(table))
+    anchors = []
+    start = 0
+    for raw in range(1, saturation + 2):
+        if raw > saturation or table[raw] != table[start]:
+            anchors.append(((start + raw - 1) / 2, table[start]))
+            start = raw
+    anchors[-1] = (saturation, table[saturation])  # only the first saturated raw is exact
+    curve = []
+    for raw in range(len(table)):
+        if raw >= saturation:
+            curve.append(float(table[saturation]))
+            continue
+        index = 1
+        while index < len(anchors) - 1 and anchors[index][0] < raw:
+            index += 1
+        (raw_a, temp_a), (raw_b, temp_b) = anchors[index - 1], anchors[index]
+        temperature = temp_a + (temp_b - temp_a) * (raw - raw_a) / (raw_b - raw_a)
+        curve.append(round(round(temperature / resolution) * resolution, 3))
+    return tuple(curve)
+
+TEMPERATURE_CURVE = buildTemperatureCurve()
+
+# inverse of the curve, built once: temperature in resolution steps -> raw value with the
+# closest temperature (the lower raw value on ties and on the saturated end)
+def buildTemperatureEncoding(curve=TEMPERATURE_CURVE, resolution=TEMPERATURE_RESOLUTION):
+    encoding = {}
+    for step in range(round(curve[0] / resolution), round(curve[-1] / resolution) + 1):
+        temperature = round(step * resolution, 3)
+        raw = bisect.bisect_left(curve, temperature)
+        if raw > 0 and (raw == len(curve) or
+                        round(temperature - curve[raw - 1], 3) <= round(curve[raw] - temperature, 3)):
+            raw -= 1
+        encoding[step] = raw
+    return encoding
+
+TEMPERATURE_ENCODING = buildTemperatureEncoding()
+
+# raw value for a temperature (setpoints are written with this), None if out of range
+def encodeTemperature(temperature):
+    return TEMPERATURE_ENCODING.get(round(float(temperature) / TEMPERATURE_RESOLUTION))
+
+# codec tables, built once: every variable decodes with a 256-entry table lookup,
+# bits encode with a mask, fanspeeds with an inverse lookup table
+_DECODE_BY_TYPE = {
+    "temperature": TEMPERATURE_CURVE,
+    "fanspeed": tuple(int(FANSPEEDS.get(raw, 1)) for raw in range(256)),
+    "dec": tuple(range(256)),
+}
+_DECODE_BITS = [tuple(bool(raw >> bit & 0x01) for raw in range(256)) for bit in range(8)]
+_DECODE_DIVIDED_BY_3 = tuple(raw // 3 for raw in range(256))  # defrost_hysteresis: 0x03 = 1°C
+_ENCODE_BY_TYPE = {
+    "fanspeed": {speed: raw for raw, speed in FANSPEEDS.items()},
+}
+
+def _decodeTable(varname, vardef):
+    if vardef["type"] == "bit":
+        return _DECODE_BITS[vardef["bitposition"]]
+    if varname == "defrost_hysteresis":
+        return _DECODE_DIVIDED_BY_3
+    return _DECODE_BY_TYPE.get(vardef["type"])
+
+DECODE_TABLES = {varname: _decodeTable(varname, vardef) for varname, vardef in REGISTERS_AND_COILS.items()}
+BIT_MASKS = {
+    varname: 1 << vardef["bitposition"]
+    for varname, vardef in REGISTERS_AND_COILS.items() if vardef["type"] == "bit"
+}
+REGISTER_DECODERS = {
+    varid: tuple((varname, DECODE_TABLES[varname]) for varname in varnames)
+    for varid, varnames in READ_PLAN.items()
+}
+
+# all variables of a register, decoded from one raw byte
+def decodeRegister(varid, rawvalue):
+    return {varname: table[rawvalue] for varname, table in REGISTER_DECODERS.get(varid, ())}
+
+# variables the values of HeliosBase._addCalculationsToReadings() are derived from
+CALCULATION_INPUTS = frozenset((
+    'fault_number', 'temperature_outdoor_air', 'temperature_supply_air',
+    'temperature_extract_air', 'temperature_exhaust_air',
+    'rh_sensor1_raw', 'rh_sensor2_raw', 'co2_reading_upper_byte', 'co2_reading_lower_byte',
+    'co2_setting_upper_byte', 'co2_setting_lower_byte', 'co2_sensor1_present', 'co2_sensor2_present',
+    'co2_sensor3_present', 'co2_sensor4_present', 'co2_sensor5_present',
+    'fanspeed', 'input_fan_percent', 'output_fan_percent'
+))
+
+# split a byte stream into valid 6-byte telegrams (0x01, sender, receiver, register,
+# value, checksum); incomplete bytes are kept for the next chunk, jitter is skipped
+class TelegramFramer:
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self.skipped = 0  # jitter bytes dropped so far
+        self.crc_failures = 0  # start bytes followed by a wrong checksum
+
+    def feed(self, data):
+        buffer = self._buffer
+        buffer += data
+        telegrams = []
+        pos, end = 0, len(buffer)
+        while True:
+            start = buffer.find(0x01, pos)
+            if start < 0 or end - start < 6:
+                keep = end if start < 0 else start
+                self.skipped += keep - pos
+                pos = keep
+                break
+            if sum(buffer[start:start + 5]) & 0xFF == buffer[start + 5]:
+                telegrams.append(bytes(buffer[start:start + 6]))
+                self.skipped += start - pos
+                pos = start + 6
+            else:  # not a telegram start, search again behind it
+                self.crc_failures += 1
+                self.skipped += start + 1 - pos
+                pos = start + 1
+        del buffer[:pos]
+        return telegrams
+
+    def reset(self):
+        self._buffer.clear()
+
+# learns the timing of the live bus: gaps between received chunks, how long other
+# devices take to answer a request, and the polling cadence of the remotes
+class BusTiming:
+
+    GAP_BINS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)  # histogram upper bounds
+    BURST_GAP = 0.3   # silence (s) that separates two bursts of remote polling
+    EWMA = 0.2        # weight of a new sample in the moving averages
+    BURST_MISSED = 3  # periods without remote polling after which the burst cadence is forgotten
+
+    def __init__(self, own_addresses=()):
+        self._own = set(own_addresses)
+        self.last_rx = 0.0
+        self.silence_time = SLOT_SILENCE_DEFAULT
+        self.response_gap = None   # s between a foreign request and its response
+        self.burst_period = None   # s between two bursts of remote polling
+        self.burst_length = None   # s from first to last telegram of a burst
+        self._burst_samples = 0
+        self._burst_start = None
+        self._burst_last = None
+        self._request = None       # (sender, receiver, register, time) of a foreign request
+        self.own_latency = None    # s between our request and the mainboard's response
+        self.own_latency_max = 0.0
+        self._own_samples = 0
+        self.gap_histogram = [0] * (len(self.GAP_BINS_MS) + 1)
+        self.backoffs = 0
+        self.backoff_time = 0.0
+
+    def _average(self, current, sample):
+        return sample if current is None else current + self.EWMA * (sample - current)
+
+    # a chunk of bytes arrived
+    def onChunk(self, now):
+        gap_ms = (now - self.last_rx) * 1000
+        self.last_rx = now
+        for index, limit in enumerate(self.GAP_BINS_MS):
+            if gap_ms <= limit:
+                break
+        else:
+            index = len(self.GAP_BINS_MS)
+        self.gap_histogram[index] += 1
+
+    # a valid telegram of another device was seen
+    def onTelegram(self, telegram, now):
+        sender, receiver, register = telegram[1], telegram[2], telegram[3]
+        if register == 0 and sender & 0xF0 == 0x20 and sender not in self._own:
+            # read request of a remote control: track the cadence of its polling bursts
+            if self._burst_last is None or now - self._burst_last > self.BURST_GAP:
+                if self._burst_start is not None:
+                    self.burst_length = self._average(self.burst_length, self._burst_last - self._burst_start)
+                    period = now - self._burst_start
+                    if period < 60:
+                        self.burst_period = self._average(self.burst_period, period)
+                        self._burst_samples += 1
+                self._burst_start = now
+            self._burst_last = now
+            self._request = (sender, receiver, telegram[4], now)
+        elif self._request is not None and (receiver, sender, register) == self._request[:3]:
+            # response: the slot must be longer than the gap between request and response
+            self.response_gap = self._average(self.response_gap, now - self._request[3])
+            self.silence_time = min(max(self.response_gap * 1.5, SLOT_SILENCE_MIN), SLOT_SILENCE_MAX)
+            self._request = None
+            self._burst_last = now
+
+    # response to one of our own requests arrived after latency seconds
+    def onOwnResponse(self, latency):
+        self.own_latency = self._average(self.own_latency, latency)
+        self.own_latency_max = max(self.own_latency_max, latency)
+        self._own_samples += 1
+
+    # how long to wait for a response: a multiple of the slowest one seen so far
+    def responseTimeout(self):
+        if self._own_samples < 5:
+            return RESPONSE_TIMEOUT_MAX
+        return min(max(self.own_latency_max * 4, RESPONSE_TIMEOUT_MIN), RESPONSE_TIMEOUT_MAX)
+
+    # seconds to wait before a transaction of the given duration may start
+    def slotDelay(self, now, duration=SLOT_TRANSACTION_TIME):
+        silence = now - self.last_rx
+        if silence < self.silence_time:
+            return self.silence_time - silence  # bus busy
+        if self._burst_samples >= 3 and self._burst_start is not None:
+            if now - self._burst_last > self.BURST_MISSED * self.burst_period:
+                self._burst_samples = 0  # remotes stopped polling: learn the cadence again
+                return 0.0
+            # stay out of the next expected polling burst of the remotes
+            burst_length = self.burst_length or 0.0
+            periods = max(1, math.ceil((now - burst_length - self._burst_start) / self.burst_period))
+            next_burst = self._burst_start + periods * self.burst_period
+            if next_burst - duration <= now < next_burst + burst_length:
+                return next_burst + burst_length - now
+        return 0.0
+
+    # bounded, jittered exponential delay before the next attempt
+    def backoff(self, attempt):
+        delay = min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+        self.backoffs += 1
+        self.backoff_time += delay
+        return delay
+
+    def stats(self):
+        labels = [f"<={limit}ms" for limit in self.GAP_BINS_MS] + [f">{self.GAP_BINS_MS[-1]}ms"]
+        return {
+            "silence_time_ms": round(self.silence_time * 1000, 2),
+            "response_gap_ms": None if self.response_gap is None else round(self.response_gap * 1000, 2),
+            "own_latency_ms": None if self.own_latency is None else round(self.own_latency * 1000, 2),
+            "own_latency_max_ms": round(self.own_latency_max * 1000, 2),
+            "response_timeout_s": round(self.responseTimeout(), 3),
+            "remote_poll_period_s": None if self.burst_period is None else round(self.burst_period, 3),
+            "remote_burst_length_s": None if self.burst_length is None else round(self.burst_length, 3),
+            "gap_histogram": dict(zip(labels, self.gap_histogram)),
+            "backoffs": self.backoffs,
+            "backoff_time_s": round(self.backoff_time, 3),
+        }
+
+# latency histogram with fixed bins (seconds in, milliseconds out)
+class Histogram:
+
+    BINS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000)  # upper bounds
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.bins = [0] * (len(self.BINS_MS) + 1)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        milliseconds = seconds * 1000
+        for index, limit in enumerate(self.BINS_MS):
+            if milliseconds <= limit:
+                self.bins[index] += 1
+                return
+        self.bins[-1] += 1
+
+    # upper bound of the bin containing the given percentile
+    def percentile(self, percent):
+        if not self.count:
+            return None
+        rank, seen = self.count * percent / 100, 0
+        for index, amount in enumerate(self.bins):
+            seen += amount
+            if amount and seen >= rank:
+                return self.BINS_MS[index] if index < len(self.BINS_MS) else round(self.max * 1000, 2)
+        return round(self.max * 1000, 2)
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 2) if self.count else None,
+            "p50_ms": self.percentile(50),
+            "p99_ms": self.percentile(99),
+            "max_ms": round(self.max * 1000, 2),
+        }
+
+# counters and histograms for each phase of a bus transaction
+class BusStatistics:
+
+    COUNTERS = (
+        "connects", "connect_failures", "requests", "responses", "retries", "timeouts",
+        "read_failures", "slot_timeouts", "writes", "broadcasts", "preemptions",
+    )
+
+    def __init__(self):
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+        self.connect = Histogram()       # TCP connect to the adaptor
+        self.slot_wait = Histogram()     # waiting for a free sending slot
+        self.latency = Histogram()       # request sent -> response received
+        self.poll = Histogram()          # complete (full or partial) read
+        self.register_latency = {}       # varid -> Histogram
+
+    def addLatency(self, varid, seconds):
+        self.latency.add(seconds)
+        self.register_latency.setdefault(varid, Histogram()).add(seconds)
+
+    def summary(self, framer=None):
+        result = {
+            "counters": dict(self.counters),
+            "connect": self.connect.summary(),
+            "slot_wait": self.slot_wait.summary(),
+            "latency": self.latency.summary(),
+            "poll": self.poll.summary(),
+            "register_latency": {
+                f"0x{varid:02X}": histogram.summary()
+                for varid, histogram in sorted(self.register_latency.items())
+            },
+        }
+        if framer is not None:
+            result["counters"]["crc_failures"] = framer.crc_failures
+            result["counters"]["jitter_bytes"] = framer.skipped
+        return result
+
+# bus access in priority order (BUS_PRIORITY_*), first come first served within a priority
+class PriorityLock:
+
+    def __init__(self):
+        self._locked = False
+        self._waiters = []  # heap of (priority, sequence, future)
+        self._sequence = itertools.count()
+
+    def locked(self):
+        return self._locked
+
+    # is anybody with a higher priority (lower number) waiting?
+    def preempted(self, priority):
+        return any(waiter[0] < priority and not waiter[2].done() for waiter in self._waiters)
+
+    async def acquire(self, priority):
+        if not self._locked and not self._waiters:
+            self._locked = True
+            return
+        waiter = (priority, next(self._sequence), asyncio.get_running_loop().create_future())
+        heapq.heappush(self._waiters, waiter)
+        try:
+            await waiter[2]
+        except asyncio.CancelledError:
+            if waiter[2].done() and not waiter[2].cancelled():
+                self.release()  # got the lock while being cancelled
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+                heapq.heapify(self._waiters)
+            raise
+
+    # hand the lock over to the most urgent waiter, if any
+    def release(self):
+        while self._waiters:
+            future = heapq.heappop(self._waiters)[2]
+            if not future.done():
+                future.set_result(True)
+                return
+        self._locked = False
+
+    @contextlib.asynccontextmanager
+    async def __call__(self, priority):
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+# asyncio protocol for the RS485 adaptor: hands every received chunk to HeliosBase
+class HeliosProtocol(asyncio.Protocol):
+
+    def __init__(self, helios):
+        self._helios = helios
+        self._transport = None
+
+    def connection_made(self, transport):
+        self._transport = transport
+        self._helios._connectionMade()
+
+    def data_received(self, data):
+        self._helios._dataReceived(data)
+
+    def connection_lost(self, exc):
+        self._helios._connectionLost(exc, self._transport)
+
+# one mainboard on the bus of a gateway: its register cache and the device it belongs to
+class Mainboard:
+
+    def __init__(self, address, name=None, house=None):
+        self.address = address
+        self.name = name  # device name (entity ids), None for the default device
+        self.house = house or {}  # house and ventilator data for airflow and power
+        self.all_values, self.cache = {}, {}
+        self.restored = set()  # registers in the cache taken from a snapshot, not from the bus
+        self.listener = None  # passive listening: callback({varname: value})
+
 class HeliosBase:
 
     ###### Init ################################################################
 
-    def __init__(self, hass=None, ip=None, port=None, coordinator=None):
+    def __init__(self, hass=None, ip=None, port=None, coordinator=None,
+                 persistent=False, idle_timeout=DEFAULT_IDLE_TIMEOUT, verify_writes=False,
+                 address=None, lock=None, name=None, house=None):
         # self.logger = logging.getLogger(__name__)
         self.logger = logging.getLogger("helios_vallox.vent_functions")
         self._hass = hass
         self._ip = ip
         self._port = port
         self._coordinator = coordinator
-        self._socket = None
-        self._lock = threading.Lock()
-        self._all_values, self._cache = {}, {}
+        self._transport = None
+        # mainboards behind this gateway (one connection for all of them); methods without
+        # an address talk to the default one
+        self._address = BUS_ADDRESSES["MB1"] if address is None else address
+        self._lock = lock or PriorityLock()
+        self._mainboards = {}
+        self.addMainboard(self._address, name, house)
+        # persistent connection mode: keep the connection open between operations
+        self._persistent = persistent
+        self._idle_timeout = idle_timeout
+        self._last_activity = 0.0
+        self._reconnect_delay = 0
+        self._next_connect_attempt = 0.0
+        # read back written registers and repeat writes until the mainboard took them
+        self._verify_writes = verify_writes
+        # telegram layer: bus silence detection and matching of our responses
+        self._timing = BusTiming((BUS_ADDRESSES["_HA"],))
+        self._framer = TelegramFramer()
+        self._stats = BusStatistics()
+        self._pending_response = None  # (sender, receiver, register, future)
+        # passive listening: decode telegrams of mainboards and remotes on the bus
+        self._listener_task = None
+        self._telegram_callback = None  # raw telegrams (multiplexing proxy)
 
     ###### Exposed functions (used from outside) ###############################
 
-    # reads a single variable from the ventilation
-    def readSingleValue(self, varname):
-        if not self._connect():
-            return {}
-        self._lock.acquire()
-        self._cache.pop(REGISTERS_AND_COILS[varname]["varid"], None)
-        try:
-            value = self._performRead(varname)
-            return {varname: value}
-        except Exception as e:
-            self.logger.error(f"Exception in _readSingleValue(): {e}")
-        finally:
-            self._lock.release()
+    # another mainboard behind the same gateway (further units on the bus)
+    def addMainboard(self, address, name=None, house=None):
+        mainboard = self._mainboards.get(address)
+        if mainboard is None:
+            mainboard = self._mainboards[address] = Mainboard(address, name, house)
+        elif name is not None or house:
+            mainboard.name, mainboard.house = name, house or {}
+        return mainboard
+
+    # start decoding bus traffic in the background; callback receives {varname: value}
+    # of the given mainboard
+    def startListening(self, callback, address=None):
+        self._mainboard(address).listener = callback
+        if self._listener_task is None or self._listener_task.done():
+            self._listener_task = asyncio.get_running_loop().create_task(self._listen())
+
+    # hand every valid telegram on the bus (including our responses) to callback(bytes)
+    def watchTelegrams(self, callback):
+        self._telegram_callback = callback
+
+    # stop the background listener (when no other mainboard listens anymore)
+    async def stopListening(self, address=None):
+        self._mainboard(address).listener = None
+        if any(mainboard.listener is not None for mainboard in self._mainboards.values()):
+            return
+        if self._listener_task is not None:
+            self._listener_task.cancel()
+            try:
+                await self._listener_task
+            except asyncio.CancelledError:
+                pass
+            self._listener_task = None
+
+    # opens the connection (kept open afterwards in persistent mode)
+    async def connect(self):
+        async with self._lock(BUS_PRIORITY_READ):
+            try:
+                return await self._connect()
+            finally:
+                self._releaseConnection()
+
+    # closes the connection, no matter which mode is used
+    async def disconnect(self):
+        async with self._lock(BUS_PRIORITY_WRITE):
             self._disconnect()
 
-    # reads all known variables from the ventilation
-    def readAllValues(self):
-        if not self._connect():
+    # closes a persistent connection that has not been used for idle_timeout seconds
+    async def closeIdleConnection(self):
+        if self._lock.locked():
+            return  # connection is in use right now
+        async with self._lock(BUS_PRIORITY_POLL):
+            if self._transport is not None and self._idle_timeout and \
+               time.monotonic() - self._last_activity > self._idle_timeout:
+                self.logger.debug("Closing idle connection.")
+                self._disconnect()
+
+    # raw values of all registers read, written or seen on the bus (for a snapshot)
+    def cachedRegisters(self, address=None):
+        mainboard = self._mainboard(address)
+        return {varid: rawvalue for varid, rawvalue in mainboard.cache.items() if varid not in mainboard.restored}
+
+    # take raw values from a snapshot until the registers are read from the bus; they
+    # are never used as the base of a bit write
+    def restoreRegisters(self, registers, address=None):
+        mainboard = self._mainboard(address)
+        for varid, rawvalue in registers.items():
+            if varid not in mainboard.cache:
+                mainboard.cache[varid] = rawvalue
+                mainboard.restored.add(varid)
+
+    # decoded values of all variables in a register, as last read or written
+    def registerValues(self, varid, address=None):
+        rawvalue = self._mainboard(address).cache.get(varid)
+        if rawvalue is None or varid not in READ_PLAN:
             return {}
-        self._lock.acquire()
-        self._all_values, self._cache = {}, {}
-        try:
-            start_time = time.time()
-            for varname in REGISTERS_AND_COILS:
-                value = self._performRead(varname)
-                self._all_values[varname] = value
-            self._all_values = self._addCalculationsToReadings(self._all_values)
-            self.logger.info(f"Full read took {time.time() - start_time:.2f}s.")
-            return self._all_values
-        except Exception as e:
-            self.logger.error(f"Exception in _readAllValues(): {e}")
-        finally:
-            self._lock.release()
-            self._disconnect()
+        return decodeRegister(varid, rawvalue)
+
+    # reads the raw value of a register (None if the mainboard did not answer)
+    async def readRaw(self, varid, address=None):
+        mainboard = self._mainboard(address)
+        async with self._lock(BUS_PRIORITY_READ):
+            try:
+                if not await self._connect():
+                    return None
+                return await self._readRegister(varid, f"0x{varid:02X}", mainboard)
+            finally:
+                self._releaseConnection()
+
+    # puts a telegram of another client on the bus, in a free sending slot
+    async def forwardTelegram(self, telegram):
+        async with self._lock(BUS_PRIORITY_WRITE):
+            try:
+                if not await self._connect():
+                    return False
+                if not await self._sendTelegram(*telegram[1:5], notify=False):
+                    return False
+                self._handleTelegram(bytes(telegram))  # writes of clients update our values
+                return True
+            finally:
+                self._releaseConnection()
+
+    # reads a single variable from the ventilation
+    async def readSingleValue(self, varname, address=None):
+        mainboard = self._mainboard(address)
+        async with self._lock(BUS_PRIORITY_READ):
+            mainboard.cache.pop(REGISTERS_AND_COILS[varname]["varid"], None)
+            try:
+                if not await self._connect():
+                    return {}
+                value = await self._performRead(varname, mainboard)
+                return {varname: value}
+            except Exception as e:
+                self.logger.error(f"Exception in _readSingleValue(): {e}")
+            finally:
+                self._releaseConnection()
+
+    # reads all known variables from the ventilation
+    async def readAllValues(self, address=None):
+        mainboard = self._mainboard(address)
+        async with self._lock(BUS_PRIORITY_POLL):
+            try:
+                if not await self._connect():
+                    return {}
+                mainboard.all_values, mainboard.cache = {}, {}
+                mainboard.restored.clear()
+                start_time = time.time()
+                values = {}
+                for varid, varnames in READ_PLAN.items():
+                    if not await self._yieldBus(BUS_PRIORITY_POLL):
+                        break
+                    values.update(await self._performRegisterRead(varid, varnames, mainboard))
+                all_values = {varname: values.get(varname) for varname in REGISTERS_AND_COILS}
+                mainboard.all_values = self._addCalculationsToReadings(all_values, mainboard.address)
+                self._stats.poll.add(time.time() - start_time)
+                self.logger.info(f"Full read took {time.time() - start_time:.2f}s.")
+                self.logger.debug(f"Bus timing: {self._timing.stats()}")
+                return mainboard.all_values
+            except Exception as e:
+                self.logger.error(f"Exception in _readAllValues(): {e}")
+            finally:
+                self._releaseConnection()
+
+    # reads the given registers only, returns all variables stored in them
+    async def readRegisters(self, varids, address=None):
+        mainboard = self._mainboard(address)
+        async with self._lock(BUS_PRIORITY_POLL):
+            try:
+                if not await self._connect():
+                    return {}
+                start_time = time.time()
+                values = {}
+                for varid in varids:
+                    if not await self._yieldBus(BUS_PRIORITY_POLL):
+                        break
+                    values.update(await self._performRegisterRead(varid, READ_PLAN[varid], mainboard))
+                mainboard.all_values.update(values)
+                self._stats.poll.add(time.time() - start_time)
+                self.logger.debug(f"Read of {len(varids)} registers took {time.time() - start_time:.2f}s.")
+                return values
+            except Exception as e:
+                self.logger.error(f"Exception in readRegisters(): {e}")
+                return {}
+            finally:
+                self._releaseConnection()
 
     # writes a single variable to the ventilation, including plausability checks
-    def writeValue(self, varname, value):
-        if not self._connect() or not self._validateBeforeWrite(varname, value):
-            return False
-        self._lock.acquire()
-        try:
-            return self._performWrite(varname, value)
-        except Exception as e:
-            self.logger.error(f"Exception in _writeValue(): {e}")
-        finally:
-            self._lock.release()
-            self._disconnect()
+    async def writeValue(self, varname, value, verify=None, address=None):
+        results = await self.writeValues({varname: value}, verify, address=address)
+        return results[varname]
+
+    # writes several variables in one bus session; bits sharing a register go out
+    # in a single telegram. atomic: nothing is written if any value is invalid.
+    # Returns {varname: success}
+    async def writeValues(self, values, verify=None, atomic=False, address=None):
+        mainboard = self._mainboard(address)
+        results = {varname: False for varname in values}
+        valid = {
+            varname: value for varname, value in values.items()
+            if self._validateBeforeWrite(varname, value, mainboard)
+        }
+        if not valid or (atomic and len(valid) < len(values)):
+            return results
+        registers = {}
+        for varname, value in valid.items():
+            registers.setdefault(REGISTERS_AND_COILS[varname]["varid"], {})[varname] = value
+        async with self._lock(BUS_PRIORITY_WRITE):
+            try:
+                if not await self._connect():
+                    return results
+                for register, writes in registers.items():
+                    success = await self._performWrite(register, writes, verify, mainboard)
+                    results.update({varname: success for varname in writes})
+            except Exception as e:
+                self.logger.error(f"Exception in _writeValues(): {e}")
+            finally:
+                self._releaseConnection()
+        return results
 
     ###### Internal functions (higher layers) ##################################
 
-    # read from a single register, cache registers containing single bits ('coils')
-    def _performRead(self, varname):
+    # state of a mainboard (the default one if address is None)
+    def _mainboard(self, address=None):
+        if address is None:
+            address = self._address
+        return self._mainboards.get(address) or self.addMainboard(address)
+
+    # between two registers of a sweep: let waiting writes and single reads go first,
+    # so their latency is one bus transaction at most (False if the bus is gone afterwards)
+    async def _yieldBus(self, priority):
+        if not self._lock.preempted(priority):
+            return True
+        self._stats.counters["preemptions"] += 1
+        self._releaseConnection()
+        self._lock.release()
+        cancelled = False
+        while True:  # the lock must be held again, even if cancelled (caller releases it)
+            try:
+                await self._lock.acquire(priority)
+                break
+            except asyncio.CancelledError:
+                cancelled = True
+        if cancelled:
+            raise asyncio.CancelledError
+        return await self._connect()
+
+    # read a single variable (bit variables use the cached register if available)
+    async def _performRead(self, varname, mainboard):
         varid = REGISTERS_AND_COILS[varname]["varid"]
-        if REGISTERS_AND_COILS[varname]["type"] == "bit" and varid in self._cache:
-            return self._convertFromRaw(varname, self._cache[varid])
+        if REGISTERS_AND_COILS[varname]["type"] == "bit" and varid in mainboard.cache and varid not in mainboard.restored:
+            return self._convertFromRaw(varname, mainboard.cache[varid])
+        return (await self._performRegisterRead(varid, [varname], mainboard)).get(varname)
+
+    # read a register once and decode all given variables from the raw byte
+    async def _performRegisterRead(self, varid, varnames, mainboard):
+        rawvalue = await self._readRegister(varid, ", ".join(varnames), mainboard)
+        if rawvalue is None:
+            return {varname: None for varname in varnames}
+        return {varname: self._convertFromRaw(varname, rawvalue) for varname in varnames}
+
+    # request a register from the mainboard, cache its raw value
+    async def _readRegister(self, varid, label, mainboard):
         try:
-            sender, receiver = BUS_ADDRESSES["_HA"], BUS_ADDRESSES["MB1"]
+            sender, receiver = BUS_ADDRESSES["_HA"], mainboard.address
             retry_count, max_retries = 0, 10
             while retry_count < max_retries:
-                if not self._syncWithRS485():
+                if not await self._syncWithRS485():
                     return None
-                self._sendTelegram(sender, receiver, 0, varid)  # request register
-                value = self._receiveTelegram(receiver, sender, varid) # read response
+                response = self._expectTelegram(receiver, sender, varid)
+                await self._sendTelegram(sender, receiver, 0, varid)  # request register
+                self._stats.counters["requests"] += 1
+                value = await self._receiveTelegram(response) # read response
                 if value is not None:
-                    if REGISTERS_AND_COILS[varname]["type"] == "bit":
-                        self._cache[varid] = value
+                    mainboard.cache[varid] = value
+                    mainboard.restored.discard(varid)
+                    self._stats.counters["responses"] += 1
+                    self._stats.counters["retries"] += retry_count
                     if retry_count > 1: # log multiple re-reads (a single one is ok)
-                        self.logger.info(f"Retries for {varname}: {retry_count}.")
-                    return self._convertFromRaw(varname, value)
+                        self.logger.info(f"Retries for {label}: {retry_count}.")
+                    return value
                 retry_count += 1
                 # if there are several HA instances running, reads may overlap each other
-                # this blocking results in read times >300s and more - so lets de-sync them
-                if retry_count == 5:
-                    time.sleep(random.randint(1, 5))
+                # so de-sync them with short, jittered and growing delays
+                await asyncio.sleep(self._timing.backoff(retry_count))
             # give up, too many re-reads
-            self.logger.error(f"Failed to read '{varname}' after {retry_count} attempts.")
+            self._stats.counters["retries"] += retry_count
+            self._stats.counters["read_failures"] += 1
+            self.logger.error(f"Failed to read '{label}' after {retry_count} attempts.")
             return None
         except Exception as e:
-            self.logger.error(f"Exception in _performRead(): {e}")
+            self.logger.error(f"Exception in _readRegister(): {e}")
             return None
 
-    def _addCalculationsToReadings(self, all_values):
+    def _addCalculationsToReadings(self, all_values, address=None):
         # add fault text (if any)
         fault_number = all_values.get('fault_number')
         if fault_number is not None:
@@ -140,9 +802,9 @@ class HeliosBase:
             supply_air = all_values['temperature_supply_air']
             extract_air = all_values['temperature_extract_air']
             exhaust_air = all_values['temperature_exhaust_air']
-            temperature_reduction = extract_air - exhaust_air
-            temperature_gain = supply_air - outdoor_air
-            temperature_balance = temperature_gain - temperature_reduction
+            temperature_reduction = round(extract_air - exhaust_air, 1)
+            temperature_gain = round(supply_air - outdoor_air, 1)
+            temperature_balance = round(temperature_gain - temperature_reduction, 1)
             efficiency = 100
             delta = extract_air - outdoor_air
             if delta != 0:  # prevent div/0 if temeperatures are the same
@@ -154,109 +816,267 @@ class HeliosBase:
                 'temperature_balance': temperature_balance,
                 'efficiency': efficiency
             })
+        # add relative humidity of the rH sensors (-1 = no sensor)
+        for index in (1, 2):
+            raw = all_values.get(f'rh_sensor{index}_raw')
+            if raw is not None:
+                all_values[f'rh_sensor_{index}'] = int((raw - 51) / 2.04) if raw >= 0x33 else -1
+        # add CO2 concentration and setting from their two bytes (-1 = no sensor)
+        co2_present = any(all_values.get(f'co2_sensor{index}_present') for index in range(1, 6))
+        for name, prefix in (('co2_concentration', 'co2_reading'), ('co2_setting', 'co2_setting')):
+            upper, lower = all_values.get(f'{prefix}_upper_byte'), all_values.get(f'{prefix}_lower_byte')
+            if not co2_present or upper is None or lower is None:
+                all_values[name] = -1
+            else:
+                all_values[name] = upper * 256 + lower
+        house = self._mainboard(address).house
+        if house:
+            self._addHouseCalculations(all_values, house)
         return all_values
 
-    # write to a single register
-    def _performWrite(self, varname, value):
+    # add DIN airflow levels and effective airflow / power (see 'house' in vent_conf.yaml).
+    # These are theoretical values based on the ventilator curves, filters are not considered!
+    def _addHouseCalculations(self, all_values, house):
+        area = house.get('area')
+        if area:
+            din_airflow = -0.001 * area ** 2 + 1.15 * area + 20
+            all_values['din_airflow_moisture_protection'] = int(house.get('isolation_factor', 0.4) * din_airflow)
+            for name, factor in DIN_AIRFLOW_FACTORS.items():
+                all_values[name] = int(factor * din_airflow)
+        fanspeed = all_values.get('fanspeed')
+        fan_percents = (all_values.get('input_fan_percent'), all_values.get('output_fan_percent'))
+        if fanspeed is None or None in fan_percents:
+            return
+        for name, key in (('effective_airflow', 'airflow_per_mode'), ('electrical_power', 'power_per_mode')):
+            per_mode = house.get(key)
+            if per_mode and fanspeed < len(per_mode):
+                all_values[name] = int(per_mode[fanspeed] * min(fan_percents) / 100)
+        volume = house.get('volume')
+        if volume and 'effective_airflow' in all_values:
+            all_values['air_exchange_rate'] = round(all_values['effective_airflow'] / volume, 2)
+
+    # write one or more variables of a single register
+    async def _performWrite(self, register, writes, verify, mainboard):
         try:
             # preparations
-            vardef = REGISTERS_AND_COILS[varname]
-            if vardef["type"] == "bit":
-                currentval = self._cache.get(vardef["varid"])
+            vardefs = {varname: REGISTERS_AND_COILS[varname] for varname in writes}
+            if any(vardef["type"] == "bit" for vardef in vardefs.values()):
+                if register not in mainboard.cache or register in mainboard.restored:  # other bits must be kept
+                    await self._readRegister(register, ", ".join(writes), mainboard)
+                rawvalue = mainboard.cache.get(register)
+                if rawvalue is None:
+                    self.logger.error(f"Writing failed: Cannot read register 0x{register:02X}.")
+                    return False
+            else:
+                rawvalue = None
+            for varname, value in writes.items():  # apply all bits to the same raw value
+                rawvalue = self._convertToRaw(varname, value, rawvalue)
+                if rawvalue is None:
+                    self.logger.error(f"Writing failed: Cannot convert {value}.")
+                    return False
+            sender, receiver = BUS_ADDRESSES["_HA"], mainboard.address
+            if verify is None:
+                verify = self._verify_writes
+            verify = verify and all(vardef.get("verify", True) for vardef in vardefs.values())
+            repeats = 2 if any(vardef.get("write_twice") for vardef in vardefs.values()) else 1
+            description = ", ".join(f"{value} to {varname}" for varname, value in writes.items())
+            # the actual write (repeated until confirmed in verify mode)
+            for attempt in range(WRITE_VERIFY_RETRIES + 1 if verify else 1):
+                self.logger.info(f"Writing {description}")
+                for _ in range(repeats):
+                    await self._sendTelegram(sender, receiver, register, rawvalue)
+                    self._stats.counters["writes"] += 1
+                if not verify:
+                    break
+                confirmed = await self._readRegister(register, ", ".join(writes), mainboard)
+                if confirmed is not None and all(
+                    self._convertFromRaw(varname, confirmed) == self._convertFromRaw(varname, rawvalue)
+                    for varname in writes
+                ):
+                    break
+                self.logger.debug(f"Writing {description} not confirmed (attempt {attempt + 1}).")
             else:
-                currentval = None
-            rawvalue = self._convertToRaw(varname, value, currentval)
-            if rawvalue is None:
-                self.logger.error(f"Writing failed: Cannot convert {value}.")
+                self.logger.error(f"Writing {description} was not confirmed by the mainboard.")
                 return False
-            sender, receiver = BUS_ADDRESSES["_HA"], BUS_ADDRESSES["MB1"]
-            register = vardef["varid"]
-            # the actual write
-            self.logger.info(f"Writing {value} to {varname}")
-            self._sendTelegram(sender, receiver, register, rawvalue)
-            self._all_values[varname] = value   # update entities and bitcache
-            if vardef["type"] == "bit":
-                self._cache[vardef["varid"]] = rawvalue
+            if not verify:
+                mainboard.cache[register] = rawvalue
+                mainboard.restored.discard(register)
+            mainboard.all_values.update(self.registerValues(register, mainboard.address))   # update entities and bitcache
             return True
         except Exception as e:
             self.logger.error(f"Exception in _performWrite(): {e}")
             return False
 
+    # listener task: keeps the connection up, the protocol decodes all bus traffic
+    async def _listen(self):
+        self.logger.debug("Passive listening started.")
+        try:
+            while True:
+                async with self._lock(BUS_PRIORITY_POLL):
+                    if await self._connect():
+                        self._last_activity = time.monotonic()  # keep the connection
+                await asyncio.sleep(RECONNECT_BACKOFF_MIN)
+        finally:
+            self.logger.debug("Passive listening stopped.")
+
+    # decode a valid telegram seen on the bus (not requested by us)
+    def _handleTelegram(self, telegram):
+        sender, receiver, register, rawvalue = telegram[1], telegram[2], telegram[3], telegram[4]
+        if register == 0 or register not in READ_PLAN:
+            return  # read request or unknown register
+        if receiver == BUS_ADDRESSES["MB*"]:
+            mainboards = list(self._mainboards.values())  # written to all mainboards
+        else:
+            mainboards = [self._mainboards[a] for a in {sender, receiver} if a in self._mainboards]
+        if not mainboards:
+            return  # a mainboard we do not know
+        self._stats.counters["broadcasts"] += 1
+        values = decodeRegister(register, rawvalue)
+        for mainboard in mainboards:
+            mainboard.cache[register] = rawvalue
+            mainboard.restored.discard(register)
+            if mainboard.listener is None:
+                continue
+            try:
+                mainboard.listener(values)
+            except Exception as e:
+                self.logger.error(f"Exception in listener callback: {e}")
+
     ###### Internal functions (lower layers) ###################################
 
     # connect to bus upon start and re-connect if needed
-    def _connect(self):
-        if self._socket:
-            try:
-                self._socket.recv(1, socket.MSG_PEEK) # check for active socket
+    async def _connect(self):
+        if self._transport is not None:
+            if self._isConnectionHealthy():
+                self._last_activity = time.monotonic()
                 return True
-            except socket.error:
-                self.logger.debug("(Re-)connecting to RS485.")
-                self._socket.close()
-                self._socket = None
+            self.logger.debug("(Re-)connecting to RS485.")
+            self._disconnect()
+        if time.monotonic() < self._next_connect_attempt:
+            self.logger.debug("Connection attempt skipped, waiting for reconnect backoff.")
+            return False
+        start_time = time.monotonic()
         try:
-            self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self._socket.settimeout(1.5)
-            self._socket.connect((self._ip, self._port))
-            self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
-            self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1024)
-            self._socket.setsockopt(socket.SOL_TCP, socket.TCP_USER_TIMEOUT, 1500)
-            self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            loop = asyncio.get_running_loop()
+            self._transport, _ = await asyncio.wait_for(
+                loop.create_connection(lambda: HeliosProtocol(self), self._ip, self._port), timeout=1.5
+            )
+            sock = self._transport.get_extra_info("socket")
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1024)
+            sock.setsockopt(socket.SOL_TCP, socket.TCP_USER_TIMEOUT, 1500)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._reconnect_delay = 0
+            self._last_activity = time.monotonic()
+            self._framer.reset()
+            self._stats.connect.add(time.monotonic() - start_time)
+            self._stats.counters["connects"] += 1
             return True
         except Exception as e:
-            self.logger.error(f"Connection failed: {e}")
-            self._socket = None
+            # exponential backoff, so a refusing adaptor is not hammered with connects
+            self._reconnect_delay = min(
+                max(self._reconnect_delay * 2, RECONNECT_BACKOFF_MIN), RECONNECT_BACKOFF_MAX
+            )
+            self._next_connect_attempt = time.monotonic() + self._reconnect_delay
+            self._stats.counters["connect_failures"] += 1
+            self.logger.error(f"Connection failed: {e!r} (next attempt in {self._reconnect_delay}s)")
+            self._disconnect()
             return False
 
+    # check the open connection: closed by peer or stale?
+    def _isConnectionHealthy(self):
+        if self._idle_timeout and time.monotonic() - self._last_activity > self._idle_timeout:
+            return False  # unused for too long, gateways tend to drop those silently
+        return not self._transport.is_closing()
+
+    # keep the connection in persistent mode, else disconnect after each operation
+    def _releaseConnection(self):
+        if self._persistent and self._transport is not None:
+            self._last_activity = time.monotonic()
+        elif self._listener_task is None:
+            self._disconnect()
+
     # disconnect from bus
     def _disconnect(self):
-        if self._socket is not None:
+        if self._transport is not None:
             self.logger.debug("Disconnecting.")
-            self._socket.close()
-            self._socket = None
+            self._transport.close()
+            self._transport = None
+
+    # connection established
+    def _connectionMade(self):
+        self._timing.last_rx = time.monotonic()
+
+    # connection closed by the adaptor or by us
+    def _connectionLost(self, exc, transport=None):
+        if transport is not None and transport is not self._transport:
+            return  # late callback of a connection already replaced by a new one
+        if exc is not None:
+            self.logger.debug(f"Connection lost: {exc}")
+        self._transport = None
+        if self._pending_response is not None and not self._pending_response[3].done():
+            self._pending_response[3].set_result(None)
+
+    # frame all received bytes; hand telegrams to a waiting read or the listener
+    def _dataReceived(self, data):
+        now = time.monotonic()
+        self._timing.onChunk(now)
+        for telegram in self._framer.feed(data):
+            if self._telegram_callback is not None:
+                self._telegram_callback(telegram)
+            pending = self._pending_response
+            if (pending is not None and not pending[3].done() and
+                telegram[1] == pending[0] and # compare and return value if successful
+                telegram[2] == pending[1] and
+                telegram[3] == pending[2]):
+                pending[3].set_result(telegram[4])
+            else:
+                self._timing.onTelegram(telegram, now)
+                self._handleTelegram(telegram) # other bus traffic
 
     # discover bus silence, return a free sending slot or a timeout
-    def _syncWithRS485(self):
-        gotSlot = False
-        silence_time = 0.007  # free sending slot length
-        timeout = time.time() + 1
-        while time.time() < timeout:
-            ready = select.select([self._socket], [], [], silence_time)
-            if ready[0]:
-                try:
-                    chars = self._socket.recv(1)
-                    if chars:  # data received, bus busy
-                        continue  # try again
-                except socket.error as e:
-                    self.logger.error(f"Socket error in _syncWithRS485: {e}")
-                    return False
-            else:  # bus is quiet, we have a sending slot
-                gotSlot = True
-                break
-        return gotSlot
+    async def _syncWithRS485(self):
+        start_time = time.monotonic()
+        timeout = start_time + 1
+        while (now := time.monotonic()) < timeout:
+            if self._transport is None:
+                return False
+            delay = self._timing.slotDelay(now)
+            if delay <= 0:  # bus is quiet and no remote polling expected, we have a sending slot
+                self._stats.slot_wait.add(now - start_time)
+                return True
+            await asyncio.sleep(min(delay, timeout - now))  # bus busy
+        self._stats.counters["slot_timeouts"] += 1
+        return False
+
+    # learned bus timing (slot length, response gaps, remote polling cadence, backoffs)
+    def timingStats(self):
+        return self._timing.stats()
+
+    # counters and latency histograms of all bus phases, including the learned timing
+    def busStatistics(self):
+        return {**self._stats.summary(self._framer), "timing": self._timing.stats()}
 
     # return entity value from a raw int received from the bus
     def _convertFromRaw(self, varname, rawvalue):
-        vardef = REGISTERS_AND_COILS[varname]
-        conversion_map = {
-            "temperature": lambda v: int(NTC5K_TEMPERATURES[v]),
-            "fanspeed": lambda v: int(FANSPEEDS.get(v, 1)),
-            "bit": lambda v: bool(v >> vardef["bitposition"] & 0x01),
-            "dec": lambda v: int(v // 3) if varname == "defrost_hysteresis" else int(v)
-        }
-        return conversion_map.get(vardef["type"], lambda _: None)(rawvalue)
+        table = DECODE_TABLES[varname]
+        return None if table is None else table[rawvalue]
 
     # return a raw value from int/bool for writing to the bus
     def _convertToRaw(self, varname, value, currentval):
         vardef = REGISTERS_AND_COILS[varname]
-        conversion_map = {
-            "temperature": lambda v: int(NTC5K_TEMPERATURES.index(int(v))),
-            "fanspeed": lambda v: int({v: k for k, v in FANSPEEDS.items()}.get(int(v), 0)),
-            "bit": lambda v: currentval | (1 << vardef["bitposition"]) if str(v).lower() in {"true", "1", "on"} 
-                else currentval & ~(1 << vardef["bitposition"]),
-            "dec": lambda v: int(v * 3) if varname == "defrost_hysteresis" else int(v)
-        }
-        return conversion_map.get(vardef["type"], lambda _: None)(value)
+        if vardef["type"] == "bit":
+            if str(value).lower() in {"true", "1", "on"}:
+                return currentval | BIT_MASKS[varname]
+            return currentval & ~BIT_MASKS[varname]
+        if vardef["type"] == "dec":
+            rawvalue = int(value * 3) if varname == "defrost_hysteresis" else int(value)
+            return rawvalue if 0 <= rawvalue <= 0xFF else None
+        if vardef["type"] == "fanspeed":
+            return _ENCODE_BY_TYPE["fanspeed"].get(int(value))
+        if vardef["type"] == "temperature":
+            return encodeTemperature(value)
+        return None
 
     # calculate a telegram checksum (last byte / byte 6 of each telegram)
     def _calculateCRC(self, telegram):
@@ -266,45 +1086,45 @@ class HeliosBase:
         return sum % 256
 
     # send a telegram to the RS485 (=register read request or register write)
-    def _sendTelegram(self, sender, receiver, register, value):
+    # (writes are handed to the telegram watcher, as they never come back from the bus)
+    async def _sendTelegram(self, sender, receiver, register, value, notify=True):
         telegram = [ 0x01, sender, receiver, register, value, 0 ]
         telegram[5] = self._calculateCRC(telegram)
-        if not self._syncWithRS485():
+        if not await self._syncWithRS485():
             self.logger.error("Writing failed: No proper connection available.")
-        try:
-            self._socket.sendall(bytearray(telegram))
-            # time.sleep(0.001)
-            # self._socket.sendall(bytearray(telegram))
-            return True
-        except socket.error as e:
-            self.logger.error(f"Socket error during send: {e}")
+        if self._transport is None:
+            self.logger.error("Send failed: Not connected.")
             return False
+        self._transport.write(bytes(telegram))
+        if notify and register != 0 and self._telegram_callback is not None:
+            self._telegram_callback(bytes(telegram))
+        return True
 
-    # read a telegram from RS485 (called after sending a register read request)
-    def _receiveTelegram(self, sender, receiver, register):
-        telegram = [0, 0, 0, 0, 0, 0] # FIFO ring buffer
-        timeout = time.time() + 1.5
-        while time.time() < timeout:
-            try:
-                char = self._socket.recv(1) # parse each byte received from bus
-                if not char:
-                    continue
-                byte = char[0]
-                telegram.pop(0) # delete oldest byte from the left
-                telegram.append(byte) # add newly read byte to the right
-                if telegram[0] == 0x01: # compare and return value if successful
-                    if (telegram[1] == sender and
-                        telegram[2] == receiver and
-                        telegram[3] == register and
-                        telegram[5] == self._calculateCRC(telegram)):
-                        return telegram[4]
-            except socket.timeout:
-                continue
-        self.logger.debug("Read timeout.")
-        return None
+    # register the response we are waiting for (before sending the request)
+    def _expectTelegram(self, sender, receiver, register):
+        future = asyncio.get_running_loop().create_future()
+        self._pending_response = (sender, receiver, register, future)
+        return future
+
+    # wait for a telegram from RS485 (called after sending a register read request)
+    async def _receiveTelegram(self, response):
+        start_time = time.monotonic()
+        register = self._pending_response[2]
+        try:
+            value = await asyncio.wait_for(response, timeout=self._timing.responseTimeout())
+            if value is not None:
+                self._timing.onOwnResponse(time.monotonic() - start_time)
+                self._stats.addLatency(register, time.monotonic() - start_time)
+            return value
+        except asyncio.TimeoutError:
+            self._stats.counters["timeouts"] += 1
+            self.logger.debug("Read timeout.")
+            return None
+        finally:
+            self._pending_response = None
 
     # Plausibility checks before writing to the bus
-    def _validateBeforeWrite(self, varname, value):
+    def _validateBeforeWrite(self, varname, value, mainboard=None):
         # Check for valid variable name
         if REGISTERS_AND_COILS.get(varname) is None:
             self.logger.error(f"Writing stopped: Invalid variable '{varname}'.")
@@ -317,8 +1137,10 @@ class HeliosBase:
         if REGISTERS_AND_COILS[varname]["write"] != True:
             self.logger.error(f"Writing stopped: '{varname}' is read-only.")
             return False
-        # Make sure value is int or bool
-        if not isinstance(value, (int, bool)):
+        # Make sure value is int or bool (temperatures may have decimals)
+        if REGISTERS_AND_COILS[varname]["type"] == "temperature" and isinstance(value, float):
+            pass
+        elif not isinstance(value, (int, bool)):
             if REGISTERS_AND_COILS[varname]["type"] == "bit":
                 if value in ['1', True, 'True', 'true', 'On', 'on', 'ON'] or \
                 value in ['0', False, 'False', 'false', 'Off', 'off', 'OFF']:
@@ -331,37 +1153,45 @@ class HeliosBase:
                 return False
         # Check if value is within allowed limits (HA only, not at CLI!)
         if self._hass:
-            entity = self._hass.states.get(f"sensor.ventilation_{varname}")
+            name = (mainboard or self._mainboard()).name
+            prefix = f"ventilation_{name}" if name else "ventilation"
+            entity = self._hass.states.get(f"sensor.{prefix}_{varname}")
             if entity:
                 min_value = entity.attributes.get("min_value")
                 max_value = entity.attributes.get("max_value")
-                min_value = int(min_value) if isinstance(min_value, (int, float)) else None
-                max_value = int(max_value) if isinstance(max_value, (int, float)) else None
+                min_value = min_value if isinstance(min_value, (int, float)) else None
+                max_value = max_value if isinstance(max_value, (int, float)) else None
                 self.logger.debug(f"Validating '{varname}': value={value}, min={min_value}, max={max_value}")
-                if min_value is not None and int(value) < min_value:
+                if min_value is not None and value < min_value:
                     self.logger.error(f"Writing stopped: {value} below min of {min_value}.")
                     return False
-                if max_value is not None and int(value) > max_value:
+                if max_value is not None and value > max_value:
                     self.logger.error(f"Writing stopped: {value} above max of {max_value}.")
                     return False
+        # Make sure the value can be encoded (bits are applied to the register at write time)
+        if REGISTERS_AND_COILS[varname]["type"] != "bit" and self._convertToRaw(varname, value, None) is None:
+            self.logger.error(f"Writing stopped: Cannot convert {value} for '{varname}'.")
+            return False
         return True
 
 ###### for CLI (command line) testing only #####################################
 
-def main():
+async def main():
     parser = argparse.ArgumentParser(description="Test HeliosBase functions")
     parser.add_argument("--ip", type=str, default=DEFAULT_IP, help="IP address of the device")
     parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port of the device")
+    parser.add_argument("--address", type=lambda x: int(x, 0), default=BUS_ADDRESSES["MB1"],
+                        help="Bus address of the mainboard (default 0x11)")
     parser.add_argument("--read", type=str, help="Variable name to read")
     parser.add_argument("--readall", action="store_true", help="Read all values")
     parser.add_argument("--write", nargs=2, metavar=("varname", "value"), help="Variable name and value to write")
     args = parser.parse_args()
-    helios = HeliosBase(args.ip, args.port)
+    helios = HeliosBase(ip=args.ip, port=args.port, address=args.address)
     if args.read:
-        value = helios.readSingleValue(args.read)
+        value = await helios.readSingleValue(args.read)
         print(value)
     elif args.readall:
-        values = helios.readAllValues()
+        values = await helios.readAllValues()
         print(values)
     elif args.write:
         varname, value = args.write
@@ -371,11 +1201,11 @@ def main():
                 value = int(value)
             elif vardef["type"] == "temperature":
                 value = float(value)
-        if helios.writeValue(varname, value):
+        if await helios.writeValue(varname, value):
             print(f"Successfully wrote {value} to {varname}")
         else:
             print(f"Failed to write {value} to {varname}")
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.DEBUG)
-    main()
+    asyncio.run(main())
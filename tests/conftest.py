@@ -0,0 +1,12 @@
+# Tests of the integration: the bus code (vent_functions.py, history.py, ...) runs without
+# Home Assistant, tests of the HA side need pytest-homeassistant-custom-component.
+# How to use:
+#    python3 -m pytest tests
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COMPONENT = os.path.join(ROOT, "custom_components", "helios_vallox_ventilation")
+sys.path.insert(0, ROOT)       # custom_components.helios_vallox_ventilation (HA)
+sys.path.insert(0, COMPONENT)  # vent_functions, history, ... as in the CLI tools
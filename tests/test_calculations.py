@@ -0,0 +1,33 @@
+# Derived values of HeliosBase._addCalculationsToReadings (no Home Assistant needed)
+
+from vent_functions import HeliosBase
+
+HOUSE_SMALL = {"area": 60.0, "volume": 150.0, "isolation_factor": 0.4,
+               "airflow_per_mode": [0, 40, 60], "power_per_mode": [0, 10, 20]}
+HOUSE_LARGE = {"area": 200.0, "volume": 500.0, "isolation_factor": 0.3,
+               "airflow_per_mode": [0, 120, 180], "power_per_mode": [0, 30, 60]}
+FANS = {"fanspeed": 2, "input_fan_percent": 100, "output_fan_percent": 50}
+
+
+def test_devices_with_different_houses():
+    helios = HeliosBase(address=0x11)
+    helios.addMainboard(0x11, house=HOUSE_SMALL)
+    helios.addMainboard(0x12, "garage", HOUSE_LARGE)
+    small = helios._addCalculationsToReadings(dict(FANS), 0x11)
+    large = helios._addCalculationsToReadings(dict(FANS), 0x12)
+    assert small["effective_airflow"] == 30
+    assert small["electrical_power"] == 10
+    assert small["air_exchange_rate"] == 0.2
+    assert large["effective_airflow"] == 90
+    assert large["electrical_power"] == 30
+    assert large["air_exchange_rate"] == 0.18
+    assert small["din_airflow_moisture_protection"] != large["din_airflow_moisture_protection"]
+
+
+def test_device_without_house():
+    helios = HeliosBase(address=0x11)
+    helios.addMainboard(0x11, house=HOUSE_SMALL)
+    helios.addMainboard(0x12, "garage")
+    values = helios._addCalculationsToReadings(dict(FANS), 0x12)
+    assert "effective_airflow" not in values
+    assert "din_airflow_moisture_protection" not in values
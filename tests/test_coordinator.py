@@ -0,0 +1,62 @@
+# HeliosCoordinator (needs Home Assistant)
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from custom_components.helios_vallox_ventilation.coordinator import HeliosCoordinator  # noqa: E402
+from custom_components.helios_vallox_ventilation.vent_functions import HeliosBase  # noqa: E402
+
+TEMPERATURES = {
+    "temperature_outdoor_air": 5.0,
+    "temperature_supply_air": 17.0,
+    "temperature_extract_air": 21.0,
+    "temperature_exhaust_air": 9.0,
+}
+
+
+def _coordinator(hass, **kwargs):
+    return HeliosCoordinator(hass, HeliosBase(hass, "127.0.0.1", 502), history_size=0, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_failed_input_clears_derived_values(hass):
+    coordinator = _coordinator(hass)
+    data = coordinator._apply_values(None, dict(TEMPERATURES))
+    assert data["efficiency"] == 75
+    assert data["temperature_gain"] == 12.0
+
+    data = coordinator._apply_values(data, {"temperature_outdoor_air": None})
+    for variable in ("efficiency", "temperature_gain", "temperature_reduction", "temperature_balance"):
+        assert data[variable] is None
+        assert coordinator.has_changed(variable)
+
+    data = coordinator._apply_values(data, {"temperature_outdoor_air": 5.0})
+    assert data["efficiency"] == 75
+
+
+@pytest.mark.asyncio
+async def test_devices_with_different_houses(hass):
+    helios = HeliosBase(hass, "127.0.0.1", 502, address=0x11)
+    small = HeliosCoordinator(hass, helios, address=0x11, history_size=0,
+                              house={"volume": 150.0, "airflow_per_mode": [0, 40, 60]})
+    large = HeliosCoordinator(hass, helios, name="garage", address=0x12, history_size=0,
+                              house={"volume": 500.0, "airflow_per_mode": [0, 120, 180]})
+    fans = {"fanspeed": 2, "input_fan_percent": 100, "output_fan_percent": 50}
+    assert small._apply_values(None, dict(fans))["effective_airflow"] == 30
+    assert large._apply_values(None, dict(fans))["effective_airflow"] == 90
+    assert large._apply_values(None, dict(fans))["air_exchange_rate"] == 0.18
+
+
+@pytest.mark.asyncio
+async def test_smoothing_window_is_fed_by_polls_only(hass):
+    filters = {"temperature_outdoor_air": {"filter": "median", "filter_window": 3}}
+    coordinator = _coordinator(hass, filters=filters)
+    data = coordinator._apply_values(None, {"temperature_outdoor_air": 5.0}, polled=True)
+    for temperature in (9.0, 9.0, 9.0):  # decoded from bus traffic between two polls
+        data = coordinator._apply_values(data, {"temperature_outdoor_air": temperature})
+    assert data["temperature_outdoor_air"] == 5.0
+    data = coordinator._apply_values(data, {"temperature_outdoor_air": 6.0}, polled=True)
+    assert data["temperature_outdoor_air"] == 5.0  # median_low of 5.0, 6.0
+    data = coordinator._apply_values(data, {"temperature_outdoor_air": 7.0}, polled=True)
+    assert data["temperature_outdoor_air"] == 6.0
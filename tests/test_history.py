@@ -0,0 +1,16 @@
+# RegisterHistory (no Home Assistant needed)
+
+from history import RegisterHistory
+
+FANSPEED = 0x29  # raw 0x01 = fanspeed 1, 0x03 = 2, 0x07 = 3
+
+
+def test_copy_is_not_changed_by_new_samples():
+    history = RegisterHistory(3, registers=(FANSPEED,))
+    for timestamp, raw in ((1, 0x01), (2, 0x03), (3, 0x07)):
+        history.add(timestamp, {FANSPEED: raw})
+    snapshot = history.copy()
+    history.add(4, {FANSPEED: 0x01})  # wraps: overwrites the sample of timestamp 1
+    history.add(5, {})
+    assert snapshot.query(["fanspeed"]) == {"timestamps": [1, 2, 3], "values": {"fanspeed": [1, 2, 3]}}
+    assert history.query(["fanspeed"]) == {"timestamps": [3, 4, 5], "values": {"fanspeed": [3, 1, None]}}
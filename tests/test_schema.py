@@ -0,0 +1,24 @@
+# Configuration schema (needs Home Assistant)
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from custom_components.helios_vallox_ventilation.const import DOMAIN  # noqa: E402
+from custom_components.helios_vallox_ventilation.schema import CONFIG_SCHEMA  # noqa: E402
+
+
+def test_devices_with_own_house():
+    config = CONFIG_SCHEMA({DOMAIN: {
+        "ip_address": "192.168.178.36",
+        "port": 502,
+        "house": {"area": 120, "airflow_per_mode": "0, 60, 90"},
+        "devices": [
+            {"name": "garage", "address": 0x12, "house": {"area": 40, "airflow_per_mode": [0, 20, 30]}},
+            {"name": "office", "address": 0x13},
+        ],
+    }})[DOMAIN]
+    garage, office = config["devices"]
+    assert config["house"]["airflow_per_mode"] == [0.0, 60.0, 90.0]
+    assert garage["house"] == {"area": 40.0, "isolation_factor": 0.4, "airflow_per_mode": [0.0, 20.0, 30.0]}
+    assert "house" not in office  # shares the top level house